@@ -0,0 +1,275 @@
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from interfaces import ParseType
+from utils import (
+    extract_all_text,
+    extract_data_math_expressions,
+    extract_math_expressions,
+    iter_math_expressions,
+    iter_text_leaves,
+    validate_text,
+)
+from synth import SyntheticExport
+from loader import read_jsonl
+from workingset import WorkingSet
+from categories import resolve_path, category_groups
+from transform import transform_records
+
+
+# Regressions beyond this fraction of the baseline throughput are reported
+DEFAULT_TOLERANCE = 0.2
+# Full parses are orders of magnitude slower than the other hot paths (Lark
+# ~50 ms, ANTLR ~10 ms per expression), so they get fewer items
+PARSER_EXPRESSIONS = {
+    ParseType.PYLATEXENC: 500,
+    ParseType.SYMPY_ANTLR: 100,
+    ParseType.SYMPY_LARK: 20,
+    ParseType.CASCADE: 100,
+}
+TRANSFORM_EXPRESSION = (
+    '{"id": idx, "category": metadata.sub_category, "answer": verification}'
+)
+
+
+def extract_math_expressions_regex(text: str, inline_only: bool = False) -> list[str]:
+    """The previous regex-per-match implementation, kept as a benchmark reference."""
+    INLINE_MATH_REGEX = r"(?<!\\)(?:\$(?!\$)[\s\S]*?(?<!\\)\$(?!\$)|\\\([\s\S]*?\\\))"
+    BLOCK_MATH_REGEX = r"(?<!\\)(?:\$\$[\s\S]*?(?<!\\)\$\$|\\\[[\s\S]*?\\\])"
+    BLOCK_DELIMITERS = [(r"^\$\$", r"\$\$$"), (r"^\\\[", r"\\\]$")]
+    INLINE_DELIMITERS = [(r"^\$", r"\$$"), (r"^\\\(", r"\\\)$")]
+
+    all_math = re.findall(f"{BLOCK_MATH_REGEX}|{INLINE_MATH_REGEX}", text)
+    cleaned_expressions = []
+    for expr in all_math:
+        delimiters = INLINE_DELIMITERS if inline_only else BLOCK_DELIMITERS
+        for start, end in delimiters:
+            if re.search(start, expr) and re.search(end, expr):
+                cleaned_expressions.append(re.sub(f"{start}|{end}", "", expr))
+                break
+    return cleaned_expressions
+
+
+def sample_solution_text(paragraphs: int = 200) -> str:
+    """A long solution text mixing prose, inline and block math."""
+    parts = []
+    for i in range(paragraphs):
+        parts.append(
+            f"Step {i}: let $x_{i} = \\frac{{{i}}}{{{i + 1}}}$ and note that the cost "
+            f"is \\$5. Then \\(y = x_{i}^2\\) gives\n"
+            f"$$\\sum_{{k=1}}^{{{i}}} k = \\frac{{{i}({i}+1)}}{{2}}$$\n"
+            f"\\[\\int_0^{{{i}}} t\\,dt\\]\n"
+        )
+    return "".join(parts)
+
+
+def timeit(func, *args, repeat: int = 20) -> float:
+    """Best wall time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_extract_math_expressions():
+    text = sample_solution_text()
+    assert extract_math_expressions(text) == extract_math_expressions_regex(text)
+
+    before = timeit(extract_math_expressions_regex, text)
+    after = timeit(extract_math_expressions, text)
+    print(
+        f"extract_math_expressions: {len(text):,} chars, "
+        f"regex-per-match {before * 1000:.2f} ms, "
+        f"str.find scanner {after * 1000:.2f} ms ({before / after:.1f}x)"
+    )
+
+    # The same comparison over every string of real-shaped rows
+    leaves = [
+        text
+        for record in SyntheticExport(rows=500).records()
+        for text in iter_text_leaves(record)
+    ]
+    assert [extract_math_expressions(text) for text in leaves] == [
+        extract_math_expressions_regex(text) for text in leaves
+    ]
+    before = timeit(lambda: [extract_math_expressions_regex(text) for text in leaves])
+    after = timeit(lambda: [extract_math_expressions(text) for text in leaves])
+    print(
+        f"extract_math_expressions: {len(leaves):,} row strings, "
+        f"regex-per-match {before * 1000:.2f} ms, "
+        f"str.find scanner {after * 1000:.2f} ms ({before / after:.1f}x)"
+    )
+
+
+def measure(func, repeat: int) -> tuple[float, float]:
+    """Best wall time over `repeat` calls and the peak traced memory of one call, in MB."""
+    seconds = timeit(func, repeat=repeat)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+
+def build_suite(rows: int, workdir: str) -> dict:
+    """
+    Benchmark name -> (items processed per call, unit, function).
+
+    Every benchmark runs on the same deterministic synthetic export.
+    """
+    export = SyntheticExport(rows=rows)
+    records = list(export.records())
+    path = export.write(os.path.join(workdir, "export.jsonl"))
+    gz_path = os.path.join(workdir, "export.jsonl.gz")
+    with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        dst.write(src.read())
+
+    df = read_jsonl(path)
+    texts = [record["solution"] for record in records]
+    expressions = [expr for text in texts for expr, _, _ in iter_math_expressions(text)]
+    ids = df["idx"].tolist()
+    some_ids = ids[::10]
+
+    suite = {}
+    for parse_type in ParseType:
+        sample = expressions[: PARSER_EXPRESSIONS.get(parse_type, 2_000)]
+        suite[f"validate_text[{parse_type.value}]"] = (
+            len(sample),
+            "expr",
+            lambda sample=sample, parse_type=parse_type: [
+                validate_text(expr, parse_type, use_cache=False) for expr in sample
+            ],
+        )
+    suite["extract_math_expressions"] = (
+        len(texts),
+        "text",
+        lambda: [extract_math_expressions(text) for text in texts],
+    )
+    suite["extract_data_math_expressions"] = (
+        len(records),
+        "row",
+        lambda: [extract_data_math_expressions(record) for record in records],
+    )
+    suite["extract_all_text"] = (
+        len(records),
+        "row",
+        lambda: [extract_all_text(record) for record in records],
+    )
+    suite["read_jsonl"] = (len(records), "row", lambda: read_jsonl(path))
+    suite["read_jsonl[gzip]"] = (len(records), "row", lambda: read_jsonl(gz_path))
+
+    def id_filters():
+        working_set = WorkingSet(df, "idx")
+        working_set.remove(some_ids)
+        working_set.add(some_ids[::2])
+        working_set.extract(ids[::3])
+        return working_set.frame()
+
+    suite["id_filters"] = (len(df), "row", id_filters)
+    suite["category_stats"] = (
+        len(df),
+        "row",
+        lambda: category_groups(resolve_path(df, "metadata.sub_category")),
+    )
+    suite["gencsv_transform"] = (
+        len(records),
+        "row",
+        lambda: transform_records(records, TRANSFORM_EXPRESSION, workers=1),
+    )
+    return suite
+
+
+def run_suite(rows: int, repeat: int, only: str | None = None) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, (items, unit, func) in build_suite(rows, workdir).items():
+            if only and only not in name:
+                continue
+            seconds, peak_mb = measure(func, repeat)
+            results[name] = {
+                "throughput": items / seconds,
+                "unit": f"{unit}/s",
+                "seconds": seconds,
+                "peak_mb": peak_mb,
+            }
+            print(
+                f"{name:36} {items / seconds:>14,.0f} {unit}/s "
+                f"{seconds * 1000:>10.2f} ms {peak_mb:>9.1f} MB peak",
+                flush=True,
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE):
+    """
+    Print the throughput and memory change of each benchmark against a baseline.
+
+    Returns:
+        list[str]: Names of the benchmarks whose throughput dropped by more
+            than `tolerance`
+    """
+    regressions = []
+    print(f"\n{'benchmark':36} {'throughput':>12} {'peak memory':>12}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:36} {'(new)':>12}")
+            continue
+        speed = result["throughput"] / before["throughput"] - 1
+        memory = result["peak_mb"] - before["peak_mb"]
+        flag = ""
+        if speed < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:36} {speed:>+11.1%} {memory:>+10.1f}MB{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths.")
+    parser.add_argument("--rows", type=int, default=2_000, help="Synthetic rows")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed runs per benchmark"
+    )
+    parser.add_argument("--only", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a saved JSON baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed throughput drop before a benchmark counts as a regression",
+    )
+    parser.add_argument(
+        "--scanner",
+        action="store_true",
+        help="Compare the math scanner with the old regex implementation instead",
+    )
+    args = parser.parse_args()
+
+    if args.scanner:
+        bench_extract_math_expressions()
+        sys.exit(0)
+
+    results = run_suite(args.rows, args.repeat, args.only)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"rows": args.rows, "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("rows") != args.rows:
+            print(f"Warning: baseline was run with {baseline.get('rows')} rows")
+        if compare(results, baseline["results"], args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from importlib import metadata
+
+from interfaces import ParseType
+
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "streamlit-scripts", "validation.sqlite"
+)
+DEFAULT_MEMORY_ENTRIES = 100_000
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+# Bump when validation results change without a parser library upgrade
+CACHE_SCHEMA_VERSION = 1
+PARSER_LIBRARIES = ["sympy", "pylatexenc", "lark", "antlr4-python3-runtime"]
+
+
+def normalize_expression(text: str) -> str:
+    """Normalize an expression so that trivially different spellings share a key."""
+    return " ".join(text.split())
+
+
+def parser_version() -> str:
+    """The cache schema version and the installed version of each parser library."""
+    versions = [f"schema={CACHE_SCHEMA_VERSION}"]
+    for name in PARSER_LIBRARIES:
+        try:
+            versions.append(f"{name}={metadata.version(name)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{name}=none")
+    return ";".join(versions)
+
+
+class ValidationCache:
+    """
+    Two-tier cache for validation results keyed by (expression, parse type).
+
+    The memory tier is an LRU of at most `memory_entries` results. The disk tier
+    is a SQLite table that survives reruns and sessions; once it grows past
+    `disk_bytes` the least recently used rows are evicted.
+
+    Keys include `version` (see parser_version), so results stored by other
+    parser versions are never returned; they age out of the disk tier.
+    """
+
+    def __init__(
+        self,
+        path: str | None = DEFAULT_CACHE_PATH,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        disk_bytes: int = DEFAULT_DISK_BYTES,
+        version: str | None = None,
+    ):
+        self.path = path
+        self.version = version if version is not None else parser_version()
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        self._disk_size = 0
+        self._tick = 0
+        if path:
+            self._open_disk(path)
+
+    def _open_disk(self, path):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " parse_type TEXT NOT NULL,"
+                " expression TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " used INTEGER NOT NULL,"
+                " PRIMARY KEY (parse_type, expression))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+            row = conn.execute(
+                "SELECT COALESCE(SUM(size), 0), COALESCE(MAX(used), 0) FROM results"
+            ).fetchone()
+            self._disk_size, self._tick = row
+            self._conn = conn
+        except sqlite3.Error:
+            # A read-only home or a locked file should not stop validation.
+            self._conn = None
+
+    def _key(self, text: str, parse_type: ParseType):
+        return (
+            f"{ParseType(parse_type).value}@{self.version}",
+            normalize_expression(text),
+        )
+
+    def get(self, text: str, parse_type: ParseType):
+        """Return the cached result tuple or None."""
+        key = self._key(text, parse_type)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT result FROM results WHERE parse_type = ? AND expression = ?",
+                        key,
+                    ).fetchone()
+                    if row is not None:
+                        self._tick += 1
+                        self._conn.execute(
+                            "UPDATE results SET used = ? WHERE parse_type = ? AND expression = ?",
+                            (self._tick, *key),
+                        )
+                        # Holding the write lock would block other processes
+                        self._conn.commit()
+                except sqlite3.Error:
+                    self._rollback()
+                    row = None
+                if row is not None:
+                    result = tuple(json.loads(row[0]))
+                    self._remember(key, result)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return result
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, parse_type: ParseType, result: tuple):
+        self.put_many([(text, result)], parse_type)
+
+    def put_many(self, items, parse_type: ParseType):
+        """Store (text, result) pairs, committing to disk once."""
+        with self._lock:
+            rows = []
+            for text, result in items:
+                key = self._key(text, parse_type)
+                self._remember(key, result)
+                payload = json.dumps(list(result), default=str)
+                self._tick += 1
+                rows.append((*key, payload, len(key[1]) + len(payload), self._tick))
+            if self._conn is None or not rows:
+                return
+
+            try:
+                for row in rows:
+                    previous = self._conn.execute(
+                        "SELECT size FROM results WHERE parse_type = ? AND expression = ?",
+                        row[:2],
+                    ).fetchone()
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", row
+                    )
+                    self._disk_size += row[3] - (previous[0] if previous else 0)
+                if self._disk_size > self.disk_bytes:
+                    self._evict()
+                self._conn.commit()
+            except sqlite3.Error:
+                self._rollback()
+
+    def _rollback(self):
+        """Drop an unfinished transaction and recount the disk size from what remains."""
+        try:
+            self._conn.rollback()
+            self._disk_size = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()[0]
+        except sqlite3.Error:
+            pass
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        # Drop the oldest rows until we are back under 90% of the budget so we
+        # don't pay for an eviction pass on every insert.
+        target = int(self.disk_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT used, size FROM results ORDER BY used ASC"
+        ).fetchall()
+        cutoff = None
+        for used, size in rows:
+            if self._disk_size <= target:
+                break
+            self._disk_size -= size
+            cutoff = used
+        if cutoff is not None:
+            self._conn.execute("DELETE FROM results WHERE used <= ?", (cutoff,))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM results")
+                self._conn.commit()
+                self._disk_size = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_size,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_validation_cache() -> ValidationCache:
+    """Return the process-wide cache, configured from the environment."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = os.environ.get("VALIDATION_CACHE_PATH", DEFAULT_CACHE_PATH)
+            disk_mb = os.environ.get("VALIDATION_CACHE_MB")
+            _cache = ValidationCache(
+                path=path or None,
+                disk_bytes=(
+                    int(float(disk_mb) * 1024 * 1024) if disk_mb else DEFAULT_DISK_BYTES
+                ),
+            )
+        return _cache
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Column of a columnar snapshot holding each original record as JSON text
+RECORD_COLUMN = "_record"
+
+
+def has_path(df: pd.DataFrame, path: str) -> bool:
+    """Whether `path` names a column or a nested key under one."""
+    if path in df.columns or path.split(".")[0] in df.columns:
+        return True
+    if RECORD_COLUMN in df.columns and len(df):
+        record = json.loads(df[RECORD_COLUMN].iloc[0])
+        return path in record or path.split(".")[0] in record
+    return False
+
+
+def resolve_path(df: pd.DataFrame, path: str) -> pd.Series:
+    """
+    Resolve a dotted key such as `metadata.a.b.c` for every row in one pass.
+
+    A column literally named `path` wins over nested lookup. Rows where any
+    level is missing or not a dict resolve to None. In a columnar snapshot,
+    paths that were not flattened are read from the original records.
+    """
+    if path in df.columns:
+        return df[path]
+
+    head, *rest = path.split(".")
+    if head not in df.columns and RECORD_COLUMN in df.columns:
+        values = [
+            resolve_record_path(json.loads(text), path) for text in df[RECORD_COLUMN]
+        ]
+        return pd.Series(values, index=df.index, dtype=object, name=path)
+    values = df[head].tolist()
+    for part in rest:
+        values = [
+            value.get(part) if isinstance(value, dict) else None for value in values
+        ]
+    return pd.Series(values, index=df.index, dtype=object, name=path)
+
+
+def resolve_record_path(record: dict, path: str):
+    """`resolve_path` for a single record dict."""
+    if path in record:
+        return record[path]
+
+    head, *rest = path.split(".")
+    value = record.get(head)
+    for part in rest:
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def category_groups(values: pd.Series) -> dict:
+    """
+    Group row positions by category in a single pass.
+
+    Returns:
+        dict: category -> array of row positions, largest category first
+    """
+    try:
+        indices = values.groupby(values, sort=False, observed=True).indices
+    except TypeError:
+        # Unhashable categories (lists, dicts) are grouped by their text
+        values = values.map(lambda value: None if value is None else str(value))
+        indices = values.groupby(values, sort=False, observed=True).indices
+    positions = {
+        category: np.asarray(rows, dtype=np.intp) for category, rows in indices.items()
+    }
+    return dict(sorted(positions.items(), key=lambda item: len(item[1]), reverse=True))
@@ -0,0 +1,369 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import tempfile
+import zipfile
+
+from interfaces import ParseType
+from engine import validate_batch
+from jobs import faulty_rows
+from loader import DEFAULT_CHUNK_ROWS, open_jsonl, iter_jsonl_chunks
+from categories import resolve_record_path
+from downloads import unique_category_file_name
+from supervisor import error_class
+from utils import extract_data_math_expressions
+from workingset import parse_ids
+
+
+VALUE_COLUMNS = ["id", "value", "is_latex", "is_number", "error", "error_class"]
+MATH_COLUMNS = ["id", "expression", "error", "error_class"]
+
+
+def iter_record_chunks(paths: list, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Yield lists of records from JSONL files (possibly compressed); "-" is stdin."""
+    for path in paths:
+        if path == "-":
+            yield from iter_jsonl_chunks(open_jsonl(sys.stdin.buffer), chunk_rows)
+            continue
+        with open(path, "rb") as raw:
+            yield from iter_jsonl_chunks(open_jsonl(raw, path), chunk_rows)
+
+
+def iter_records(paths: list, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    for records in iter_record_chunks(paths, chunk_rows):
+        yield from records
+
+
+def open_output(path: str | None):
+    if path is None or path == "-":
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def dump_record(record) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+class RowWriter:
+    """Write result rows with a fixed set of columns as JSONL or CSV."""
+
+    def __init__(self, f, columns: list, output_format: str):
+        self.f = f
+        self.output_format = output_format
+        if output_format == "csv":
+            self._csv = csv.DictWriter(f, fieldnames=columns)
+            self._csv.writeheader()
+
+    def write(self, rows: list[dict]):
+        if self.output_format == "csv":
+            self._csv.writerows(
+                {
+                    key: (
+                        json.dumps(value, default=str)
+                        if isinstance(value, (dict, list))
+                        else value
+                    )
+                    for key, value in row.items()
+                }
+                for row in rows
+            )
+        else:
+            self.f.writelines(dump_record(row) for row in rows)
+
+
+def read_ids(path: str, allow_dash: bool = True) -> list[str]:
+    """IDs pasted into a text file, parsed the same way as in the app."""
+    if path == "-":
+        return parse_ids(sys.stdin.read(), allow_dash=allow_dash)
+    with open(path, encoding="utf-8") as f:
+        return parse_ids(f.read(), allow_dash=allow_dash)
+
+
+def validate_values(records: list, args) -> tuple[list[dict], dict]:
+    """Validate the whole `--key` value of each record, like the Validation Results table."""
+    values = [resolve_record_path(record, args.key) for record in records]
+    results = validate_batch(
+        values, args.parse_type, args.workers, timeout=args.timeout
+    )
+    rows = []
+    counts = {"total": len(records), "valid": 0, "numbers": 0}
+    for record, value, result in zip(records, values, results):
+        is_valid, is_number, error = result[:3]
+        counts["valid"] += bool(is_valid)
+        counts["numbers"] += bool(is_number)
+        if args.errors_only and is_valid:
+            continue
+        rows.append(
+            {
+                "id": record.get(args.id_key),
+                "value": value,
+                "is_latex": is_valid,
+                "is_number": is_number,
+                "error": error,
+                "error_class": error_class(error),
+            }
+        )
+    return rows, counts
+
+
+def validate_math(records: list, args) -> tuple[list[dict], dict]:
+    """Validate the math expressions found in each record, like "Validate Latex"."""
+    if args.all_keys:
+        row_values = [tuple(record.values()) for record in records]
+    else:
+        row_values = [resolve_record_path(record, args.key) for record in records]
+    row_expressions = [
+        (record.get(args.id_key), extract_data_math_expressions(values))
+        for record, values in zip(records, row_values)
+    ]
+    expressions = [expr for _, exprs in row_expressions for expr in exprs]
+    results = validate_batch(
+        expressions, args.parse_type, args.workers, timeout=args.timeout
+    )
+    rows = []
+    faulty = faulty_rows(row_expressions, results)
+    for row in faulty:
+        for expr in row["faulty_expressions"]:
+            rows.append(
+                {
+                    "id": row["id"],
+                    "expression": expr["expression"],
+                    "error": expr["error"],
+                    "error_class": error_class(expr["error"]),
+                }
+            )
+    return rows, {"total": len(records), "faulty_ids": len(faulty)}
+
+
+def run_validate(args) -> int:
+    validate = validate_math if args.math else validate_values
+    columns = MATH_COLUMNS if args.math else VALUE_COLUMNS
+    totals = {}
+    with open_output(args.output) as f:
+        writer = RowWriter(f, columns, args.format)
+        for records in iter_record_chunks(args.inputs, args.chunk_rows):
+            rows, counts = validate(records, args)
+            writer.write(rows)
+            for name, count in counts.items():
+                totals[name] = totals.get(name, 0) + count
+
+    total = totals.get("total", 0)
+    if args.math:
+        print(
+            f"Found {totals.get('faulty_ids', 0)}/{total} IDs with LaTeX errors",
+            file=sys.stderr,
+        )
+    else:
+        print(
+            f"Total items: {total}, valid LaTeX: {totals.get('valid', 0)}, "
+            f"numbers: {totals.get('numbers', 0)}",
+            file=sys.stderr,
+        )
+    return 0
+
+
+def run_filter(args) -> int:
+    if args.add is not None:
+        if args.base is None:
+            print(
+                "--add needs --base, the file the IDs are added from", file=sys.stderr
+            )
+            return 2
+        ids = set(read_ids(args.add, allow_dash=False))
+    else:
+        ids = set(read_ids(args.remove if args.remove is not None else args.extract))
+    if not ids:
+        print("No valid IDs found", file=sys.stderr)
+        return 1
+
+    written = 0
+    matched = 0
+    seen = set()
+    with open_output(args.output) as f:
+        for record in iter_records(args.inputs, args.chunk_rows):
+            row_id = record.get(args.id_key)
+            if args.remove is not None and row_id in ids:
+                matched += 1
+                continue
+            if args.extract is not None:
+                if row_id not in ids:
+                    continue
+                matched += 1
+            seen.add(row_id)
+            f.write(dump_record(record))
+            written += 1
+
+        if args.add is not None:
+            # Only base rows that aren't already in the input are added
+            for record in iter_records([args.base], args.chunk_rows):
+                row_id = record.get(args.id_key)
+                if row_id in ids and row_id not in seen:
+                    f.write(dump_record(record))
+                    matched += 1
+                    written += 1
+
+    action = (
+        "added" if args.add is not None else "removed" if args.remove else "extracted"
+    )
+    print(
+        f"Pasted {len(ids)} IDs, {matched} rows {action}; {written} rows written",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def run_split(args) -> int:
+    output_dir = args.output_dir or tempfile.mkdtemp()
+    os.makedirs(output_dir, exist_ok=True)
+    names = {}
+    taken = set()
+    counts = {}
+    # Rows are buffered per category and appended a chunk at a time, so only
+    # one file is open however many categories there are
+    pending = {}
+    buffered = 0
+    written = set()
+
+    def flush():
+        for category, lines in pending.items():
+            mode = "a" if category in written else "w"
+            path = os.path.join(output_dir, names[category])
+            with open(path, mode, encoding="utf-8") as f:
+                f.writelines(lines)
+            written.add(category)
+        pending.clear()
+
+    for record in iter_records(args.inputs, args.chunk_rows):
+        category = resolve_record_path(record, args.key)
+        if category is None:
+            continue
+        if isinstance(category, (dict, list)):
+            # Unhashable categories are grouped by their text, as in the app
+            category = str(category)
+        if category not in names:
+            names[category] = unique_category_file_name(category, taken)
+            counts[category] = 0
+        pending.setdefault(category, []).append(dump_record(record))
+        counts[category] += 1
+        buffered += 1
+        if buffered >= args.chunk_rows:
+            flush()
+            buffered = 0
+    flush()
+
+    if args.zip:
+        with zipfile.ZipFile(
+            args.zip, "w", compression=zipfile.ZIP_DEFLATED
+        ) as archive:
+            for name in names.values():
+                archive.write(os.path.join(output_dir, name), name)
+
+    for category, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"{category}\t{count}", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run the export app's validation, ID filtering and category split without a browser.",
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "inputs",
+        nargs="*",
+        default=["-"],
+        help="JSONL files (.gz/.zst are decompressed); reads stdin when omitted",
+    )
+    common.add_argument("--id-key", default="idx", help="ID key (default: idx)")
+    common.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=DEFAULT_CHUNK_ROWS,
+        help="Records read and processed at a time",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    validate = subparsers.add_parser(
+        "validate", parents=[common], help="Validate LaTeX in every record"
+    )
+    validate.add_argument(
+        "--key", default="verification", help="Key to validate (default: verification)"
+    )
+    validate.add_argument(
+        "--math",
+        action="store_true",
+        help="Validate the math expressions inside the key instead of its whole value",
+    )
+    validate.add_argument(
+        "--all-keys",
+        action="store_true",
+        help="With --math, look for expressions in every key",
+    )
+    validate.add_argument(
+        "--parse-type",
+        type=ParseType,
+        choices=list(ParseType),
+        default=ParseType.SYMPY_ANTLR,
+    )
+    validate.add_argument(
+        "--errors-only", action="store_true", help="Only write invalid values"
+    )
+    validate.add_argument("--workers", type=int, help="Worker processes")
+    validate.add_argument(
+        "--timeout", type=float, help="Seconds per expression (0 disables)"
+    )
+    validate.add_argument("-o", "--output", help="Output file (default: stdout)")
+    validate.add_argument(
+        "--format",
+        choices=["jsonl", "csv"],
+        help="Output format (default: from the output suffix, else jsonl)",
+    )
+    validate.set_defaults(run=run_validate)
+
+    filter_ = subparsers.add_parser(
+        "filter",
+        parents=[common],
+        help="Remove, extract or add IDs listed in a text file",
+    )
+    action = filter_.add_mutually_exclusive_group(required=True)
+    action.add_argument("--remove", metavar="IDS", help="Drop records with these IDs")
+    action.add_argument(
+        "--extract", metavar="IDS", help="Keep only records with these IDs"
+    )
+    action.add_argument(
+        "--add",
+        metavar="IDS",
+        help="Append records with these IDs from --base that are not in the input",
+    )
+    filter_.add_argument("--base", help="Original file that --add takes records from")
+    filter_.add_argument("-o", "--output", help="Output JSONL (default: stdout)")
+    filter_.set_defaults(run=run_filter)
+
+    split = subparsers.add_parser(
+        "split", parents=[common], help="Write one JSONL file per category"
+    )
+    split.add_argument(
+        "--key",
+        default="metadata.sub_category",
+        help="Category key (default: metadata.sub_category)",
+    )
+    split.add_argument("--output-dir", help="Directory for the category files")
+    split.add_argument("--zip", help="Also pack the category files into this archive")
+    split.set_defaults(run=run_split)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "validate" and args.format is None:
+        args.format = "csv" if (args.output or "").endswith(".csv") else "jsonl"
+    if args.command == "split" and not (args.output_dir or args.zip):
+        build_parser().error("split needs --output-dir or --zip")
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from engine import validate_batch
+from interfaces import CascadeTier, ParseType
+from jobs import JOB_BATCH_ROWS, ValidationJob
+
+
+DEFAULT_COMPARE_PARSERS = [
+    ParseType.PYLATEXENC,
+    ParseType.SYMPY_LARK,
+    ParseType.SYMPY_ANTLR,
+]
+
+
+def result_error(result: tuple) -> str:
+    """Error of a validation result, "" when the expression is valid."""
+    if result[0]:
+        return ""
+    error = result[2] or "invalid"
+    if len(result) > 3:
+        error = f"[{CascadeTier(result[3]).value}] {error}"
+    return error
+
+
+class ComparisonJob(ValidationJob):
+    """
+    Validate the math in a list of rows with several parsers at once.
+
+    Expressions are extracted once per batch, then every parser validates the
+    same batch on its own thread; the parsers share the validation workers.
+    `results` collects the rows where the parsers disagree about at least
+    one expression, and `summary()` counts the disagreements per parser pair.
+    """
+
+    def __init__(
+        self,
+        row_ids: list,
+        row_values: list,
+        parse_types: list = DEFAULT_COMPARE_PARSERS,
+        batch_rows: int = JOB_BATCH_ROWS,
+        use_cache: bool = True,
+    ):
+        self.parse_types = list(dict.fromkeys(ParseType(p) for p in parse_types))
+        if len(self.parse_types) < 2:
+            raise ValueError("At least two parsers are needed for a comparison")
+        super().__init__(row_ids, row_values, self.parse_types[0], batch_rows)
+        self.use_cache = use_cache
+        self.seconds = dict.fromkeys(self.parse_types, 0.0)
+        self.rejected = dict.fromkeys(self.parse_types, 0)
+        # (a, b) -> expressions accepted by a and rejected by b
+        self.disagreements = {
+            (a, b): 0 for a in self.parse_types for b in self.parse_types if a != b
+        }
+
+    def _timed_batch(self, expressions: list, parse_type: ParseType):
+        # Wall time would include waiting for workers busy with the other parsers
+        seconds = []
+        results = validate_batch(
+            expressions, parse_type, use_cache=self.use_cache, worker_seconds=seconds
+        )
+        return results, sum(seconds)
+
+    def _validate(self, row_expressions: list, expressions: list) -> list[dict]:
+        with ThreadPoolExecutor(max_workers=len(self.parse_types)) as executor:
+            timed = list(
+                executor.map(
+                    lambda parse_type: self._timed_batch(expressions, parse_type),
+                    self.parse_types,
+                )
+            )
+        per_parser = [results for results, _ in timed]
+
+        rows = []
+        rejected = dict.fromkeys(self.parse_types, 0)
+        disagreements = dict.fromkeys(self.disagreements, 0)
+        position = 0
+        for row_id, exprs in row_expressions:
+            disagreeing = []
+            for expr in exprs:
+                results = [parser_results[position] for parser_results in per_parser]
+                position += 1
+                accepted = [bool(result[0]) for result in results]
+                for parse_type, ok in zip(self.parse_types, accepted):
+                    rejected[parse_type] += not ok
+                if all(accepted) or not any(accepted):
+                    continue
+                for a, a_ok in zip(self.parse_types, accepted):
+                    for b, b_ok in zip(self.parse_types, accepted):
+                        if a_ok and not b_ok:
+                            disagreements[(a, b)] += 1
+                disagreeing.append(
+                    {
+                        "expression": expr,
+                        "errors": {
+                            parse_type.value: result_error(result)
+                            for parse_type, result in zip(self.parse_types, results)
+                        },
+                    }
+                )
+            if disagreeing:
+                rows.append({"id": row_id, "expressions": disagreeing})
+
+        with self._lock:
+            for parse_type, (_, seconds) in zip(self.parse_types, timed):
+                self.seconds[parse_type] += seconds
+                self.rejected[parse_type] += rejected[parse_type]
+            for pair, count in disagreements.items():
+                self.disagreements[pair] += count
+        return rows
+
+    def summary(self) -> dict:
+        """
+        Counts so far.
+
+        Returns:
+            dict: expressions (validated per parser), seconds and rejected per
+                parser, and disagreements per (accepted by, rejected by) pair
+        """
+        with self._lock:
+            return {
+                "expressions": self.expressions_done,
+                "seconds": dict(self.seconds),
+                "rejected": dict(self.rejected),
+                "disagreements": dict(self.disagreements),
+            }
+
+    def matrix(self) -> pd.DataFrame:
+        """Expressions accepted by the row parser and rejected by the column parser."""
+        disagreements = self.summary()["disagreements"]
+        names = [parse_type.value for parse_type in self.parse_types]
+        return pd.DataFrame(
+            [
+                [disagreements.get((a, b), pd.NA) for b in self.parse_types]
+                for a in self.parse_types
+            ],
+            index=pd.Index(names, name="Accepted by"),
+            columns=pd.Index(names, name="Rejected by"),
+            dtype="Int64",
+        )
+
+    def latency(self) -> pd.DataFrame:
+        """
+        Time and verdicts per parser.
+
+        Seconds are the worker time spent on each parser's expressions, so
+        parsers sharing the pool do not count each other's work; with the
+        validation cache enabled they only cover expressions that were not cached.
+        """
+        summary = self.summary()
+        expressions = summary["expressions"]
+        return pd.DataFrame(
+            [
+                {
+                    "Parser": parse_type.value,
+                    "Rejected": summary["rejected"][parse_type],
+                    "Seconds": summary["seconds"][parse_type],
+                    "Expressions/s": (
+                        expressions / summary["seconds"][parse_type]
+                        if summary["seconds"][parse_type]
+                        else 0.0
+                    ),
+                }
+                for parse_type in self.parse_types
+            ]
+        )
@@ -0,0 +1,77 @@
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from categories import RECORD_COLUMN
+
+
+EXPORT_CHUNK_ROWS = 5_000
+
+
+def category_file_name(category) -> str:
+    return f"{str(category).replace(' ', '_').lower()}_items.jsonl"
+
+
+def unique_category_file_name(category, taken: set) -> str:
+    """
+    The file name of `category`, numbered when it is already in `taken`.
+
+    Different categories can share a file name (e.g. "A B" and "a_b"); the
+    returned name is added to `taken`.
+    """
+    name = category_file_name(category)
+    stem = name.removesuffix("_items.jsonl")
+    number = 2
+    while name in taken:
+        name = f"{stem}_{number}_items.jsonl"
+        number += 1
+    taken.add(name)
+    return name
+
+
+def iter_jsonl(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Yield the rows of `df` as JSONL text, `chunk_rows` rows at a time.
+
+    Rows of a columnar snapshot are written as their original records.
+    """
+    for start in range(0, len(df), chunk_rows):
+        if RECORD_COLUMN in df.columns:
+            lines = df[RECORD_COLUMN].iloc[start : start + chunk_rows].tolist()
+            yield "\n".join(lines) + "\n"
+            continue
+        yield df.iloc[start : start + chunk_rows].to_json(orient="records", lines=True)
+
+
+def to_jsonl(df: pd.DataFrame) -> str:
+    return "".join(iter_jsonl(df))
+
+
+def write_category_zip(df: pd.DataFrame, groups: dict, path: str | None = None) -> str:
+    """
+    Write one JSONL file per category into a ZIP archive on disk.
+
+    Each category is serialized and compressed a chunk at a time, so only one
+    chunk of text is in memory at once.
+
+    Args:
+        df: Rows to export
+        groups: category -> row positions in `df` (see categories.category_groups)
+        path: Destination file; a temporary file is created when omitted
+
+    Returns:
+        str: Path of the written archive
+    """
+    if path is None:
+        with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
+            path = tmp.name
+
+    taken = set()
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for category, positions in groups.items():
+            name = unique_category_file_name(category, taken)
+            with archive.open(name, "w", force_zip64=True) as member:
+                for text in iter_jsonl(df.iloc[positions]):
+                    member.write(text.encode("utf-8"))
+    return path
@@ -0,0 +1,236 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from interfaces import ParseType
+from cache import get_validation_cache
+from utils import validate_text_uncached, warm_up
+import instrument
+from supervisor import (
+    default_timeout,
+    default_memory_mb,
+    get_supervised_pool,
+    is_supervision_error,
+    shutdown_supervised_pool,
+)
+
+
+# Below this many uncached expressions the pool round-trip costs more than it saves
+MIN_PARALLEL_BATCH = 64
+MAX_CHUNK_SIZE = 512
+# Streamlit runs scripts on threads, so forking is unsafe here
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    configured = os.environ.get("VALIDATION_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared spawn-based process pool, recreated when the worker count changes."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=MP_CONTEXT)
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def map_in_pool(workers: int, func, *iterables) -> list:
+    """
+    `map` over the shared process pool, collected into a list.
+
+    A worker that dies (e.g. killed by the OS) breaks the whole pool, so the
+    pool is replaced and the map run once more before the error is raised.
+    """
+    iterables = [list(iterable) for iterable in iterables]
+    pool = get_process_pool(workers)
+    try:
+        return list(pool.map(func, *iterables))
+    except BrokenProcessPool:
+        _discard_pool(pool)
+    pool = get_process_pool(workers)
+    try:
+        return list(pool.map(func, *iterables))
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+atexit.register(shutdown_supervised_pool)
+
+
+def warm_up_workers(
+    parse_types,
+    workers: int | None = None,
+    timeout: float | None = None,
+    memory_mb: int | None = None,
+) -> dict:
+    """
+    Start a validation worker before the first batch and load `parse_types` in it.
+
+    Arguments default as in validate_batch. Without supervision (timeout 0)
+    small batches run in this process, so the parsers are loaded here instead.
+
+    Returns:
+        dict: Parse type -> worker load time in seconds, "loading", "failed"
+            or "loaded by a batch"; empty when no supervised worker is used
+    """
+    timeout = default_timeout() if timeout is None else timeout
+    if timeout <= 0:
+        for parse_type in parse_types:
+            warm_up(parse_type)
+        return {}
+    memory_mb = default_memory_mb() if memory_mb is None else memory_mb
+    pool = get_supervised_pool(
+        workers or default_workers(), timeout, memory_mb, MP_CONTEXT
+    )
+    pool.warm_up([ParseType(parse_type) for parse_type in parse_types])
+    return dict(pool.load_seconds)
+
+
+def _validate_chunk(texts, parse_type):
+    started = time.perf_counter()
+    results = [validate_text_uncached(text, parse_type) for text in texts]
+    return results, time.perf_counter() - started
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+@instrument.timed("engine.validate_batch")
+def validate_batch(
+    expressions: list,
+    parse_type: ParseType = ParseType.SYMPY_ANTLR,
+    workers: int | None = None,
+    chunk_size: int | None = None,
+    use_cache: bool = True,
+    timeout: float | None = None,
+    memory_mb: int | None = None,
+    worker_seconds: list | None = None,
+) -> list[tuple]:
+    """
+    Validate many expressions at once, returning results in input order.
+
+    Duplicates are validated once, cached results are reused, and the rest are
+    spread across supervised worker processes in chunks (batches smaller than
+    MIN_PARALLEL_BATCH use one worker). Each expression gets
+    at most `timeout` seconds and each worker at most `memory_mb` of address
+    space; expressions that exceed them fail with a "timeout:" or "resource:"
+    error (see supervisor.error_class) and are not cached.
+
+    Args:
+        expressions: Texts to validate (non-string values are validated inline)
+        parse_type: Parser to validate with
+        workers: Number of worker processes (defaults to VALIDATION_WORKERS or CPU count)
+        chunk_size: Expressions per pool task (defaults to an even split per worker)
+        use_cache: Whether to read and populate the validation cache
+        timeout: Seconds per expression (defaults to VALIDATION_TIMEOUT; 0 runs
+            unsupervised, in-process for small batches)
+        memory_mb: Address-space cap per worker (defaults to VALIDATION_MEMORY_MB)
+        worker_seconds: Receives the time spent validating the uncached
+            expressions, per expression or per chunk; its sum is the total
+
+    Returns:
+        list[tuple]: One (is_valid, is_number, error) tuple per input expression
+    """
+    parse_type = ParseType(parse_type)
+    workers = workers or default_workers()
+    cache = get_validation_cache() if use_cache else None
+
+    results = [None] * len(expressions)
+    pending = {}
+    for i, text in enumerate(expressions):
+        if not isinstance(text, str) or not text:
+            results[i] = validate_text_uncached(text, parse_type)
+            continue
+        if text in pending:
+            pending[text].append(i)
+            continue
+        cached = cache.get(text, parse_type) if cache is not None else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending[text] = [i]
+
+    texts = list(pending)
+    timeout = default_timeout() if timeout is None else timeout
+    memory_mb = default_memory_mb() if memory_mb is None else memory_mb
+    if chunk_size is None:
+        chunk_size = min(MAX_CHUNK_SIZE, max(1, len(texts) // (workers * 4)))
+
+    if not texts:
+        computed = []
+    elif timeout > 0:
+        pool = get_supervised_pool(workers, timeout, memory_mb, MP_CONTEXT)
+        # Small batches go to a single worker, so the pool only grows for large ones
+        chunks = (
+            [texts]
+            if len(texts) < MIN_PARALLEL_BATCH
+            else list(_chunks(texts, chunk_size))
+        )
+        computed = []
+        for chunk_results in pool.map_chunks(chunks, parse_type, worker_seconds):
+            computed.extend(chunk_results)
+    elif workers <= 1 or len(texts) < MIN_PARALLEL_BATCH:
+        computed, seconds = _validate_chunk(texts, parse_type)
+        if worker_seconds is not None:
+            worker_seconds.append(seconds)
+    else:
+        computed = []
+        for chunk_results, seconds in map_in_pool(
+            workers,
+            _validate_chunk,
+            _chunks(texts, chunk_size),
+            [parse_type] * ((len(texts) + chunk_size - 1) // chunk_size),
+        ):
+            computed.extend(chunk_results)
+            if worker_seconds is not None:
+                worker_seconds.append(seconds)
+
+    if cache is not None:
+        cache.put_many(
+            (
+                (text, result)
+                for text, result in zip(texts, computed)
+                if not is_supervision_error(result)
+            ),
+            parse_type,
+        )
+    for text, result in zip(texts, computed):
+        for i in pending[text]:
+            results[i] = result
+
+    return results
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+
+DEFAULT_FETCH_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "streamlit-scripts", "fetch"
+)
+FETCH_BLOCK_SIZE = 1024 * 1024
+FETCH_TIMEOUT = 60
+
+_url_locks = {}
+_url_locks_lock = threading.Lock()
+
+
+def fetch_dir() -> str:
+    return os.environ.get("FETCH_CACHE_DIR", DEFAULT_FETCH_DIR)
+
+
+class FetchResult:
+    """A fetched URL body on disk."""
+
+    def __init__(self, path: str, size: int, sha256: str, from_cache: bool):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.from_cache = from_cache
+
+    @property
+    def cache_key(self) -> str:
+        """Dataset key: identical bodies share a key, whatever URL they came from."""
+        return f"sha256:{self.sha256}"
+
+
+def _url_lock(url: str):
+    with _url_locks_lock:
+        return _url_locks.setdefault(url, threading.RLock())
+
+
+def _read_meta(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(path: str, meta: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+
+def fetch_url(url: str, progress=None, cache_dir: str | None = None) -> FetchResult:
+    """
+    Download `url` into an on-disk cache, revalidating and resuming when possible.
+
+    A cached body is revalidated with a conditional GET (If-None-Match /
+    If-Modified-Since), so an unchanged export costs one round trip. A
+    download that was interrupted is resumed with a Range request guarded by
+    If-Range; servers that ignore the range send the whole body again. The
+    body is stored as served, so compressed exports stay compressed on disk
+    and are decompressed when read (see loader.read_jsonl).
+
+    Args:
+        url: HTTP(S) URL of the export
+        progress: Optional callback `progress(bytes_done, total_bytes)`;
+            total_bytes is None when the server does not send a length
+        cache_dir: Cache directory (defaults to FETCH_CACHE_DIR)
+
+    Returns:
+        FetchResult: Path, size and SHA-256 of the cached body
+
+    Raises:
+        urllib.error.URLError: If the server cannot be reached or answers
+            with an error status
+    """
+    cache_dir = cache_dir or fetch_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    body_path = os.path.join(cache_dir, name)
+    part_path = f"{body_path}.part"
+    meta_path = f"{body_path}.json"
+
+    with _url_lock(url):
+        meta = _read_meta(meta_path)
+        validator = meta.get("etag") or meta.get("last_modified")
+        headers = {}
+        complete = meta.get("complete") and os.path.exists(body_path)
+        resume_from = 0
+        if complete:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        elif validator and os.path.exists(part_path):
+            resume_from = os.path.getsize(part_path)
+            if resume_from:
+                headers["Range"] = f"bytes={resume_from}-"
+                headers["If-Range"] = validator
+
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            response = urllib.request.urlopen(request, timeout=FETCH_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and complete:
+                return FetchResult(body_path, meta["size"], meta["sha256"], True)
+            if e.code == 416 and resume_from:
+                # The partial file no longer fits the body; start over
+                os.remove(part_path)
+                return fetch_url(url, progress, cache_dir)
+            raise
+
+        with response:
+            if response.status != 206:
+                resume_from = 0
+            length = response.headers.get("Content-Length")
+            total = resume_from + int(length) if length else None
+            meta = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "complete": False,
+            }
+            # Saved up front so an interrupted download can be resumed later
+            _write_meta(meta_path, meta)
+
+            # The digest is computed while streaming; a resumed download
+            # first hashes the part it already has
+            digest = hashlib.sha256()
+            if resume_from:
+                with open(part_path, "rb") as f:
+                    for block in iter(lambda: f.read(FETCH_BLOCK_SIZE), b""):
+                        digest.update(block)
+
+            done = resume_from
+            with open(part_path, "ab" if resume_from else "wb") as f:
+                while True:
+                    block = response.read(FETCH_BLOCK_SIZE)
+                    if not block:
+                        break
+                    f.write(block)
+                    digest.update(block)
+                    done += len(block)
+                    if progress is not None:
+                        progress(done, total)
+
+        if total is not None and done < total:
+            raise urllib.error.URLError(
+                f"Download ended after {done} of {total} bytes; it will resume"
+            )
+
+        os.replace(part_path, body_path)
+        meta.update(complete=True, size=done, sha256=digest.hexdigest())
+        _write_meta(meta_path, meta)
+        return FetchResult(body_path, done, meta["sha256"], False)
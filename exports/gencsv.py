@@ -1,14 +1,23 @@
-import jsonata.jsonata
+import os
 import streamlit as st
-import jsonata
 import pandas as pd
-import csv
-import io
-import base64
+
+from transform import transform_records
+from snapshot import iter_records
+from categories import has_path, resolve_path
+from writers import write_csv, write_parquet
+import instrument
+
+
+OUTPUT_FORMATS = {
+    "CSV": (write_csv, ".csv", "text/csv"),
+    "Parquet": (write_parquet, ".parquet", "application/vnd.apache.parquet"),
+}
 
 
 @st.fragment
 def gencsv():
+    instrument.bind(st.session_state.get("run_profile"))
     row_schema = st.text_area("Row Schema", value="")
 
     # Add a button to transform data using JSONata
@@ -16,68 +25,95 @@ def gencsv():
         if "df" in st.session_state:
             # Get the JSONata expression from row_schema
             try:
-                expression = jsonata.Jsonata(row_schema)
+                df = st.session_state["df"]
+                id_key = st.session_state.get("id_key")
 
-                # Create a list to store transformed rows
-                transformed_rows = []
+                # Apply JSONata transformation to all rows, chunk by chunk
+                with instrument.stage("gencsv.transform"):
+                    results, errors, columns = transform_records(
+                        list(iter_records(df)), row_schema
+                    )
+                failed_rows = {position for position, _ in errors}
+                transformed_rows = [
+                    row for i, row in enumerate(results) if i not in failed_rows
+                ]
 
-                # Apply JSONata transformation to each row in the dataframe
-                for _, row in st.session_state["df"].iterrows():
-                    # Convert row to dict for JSONata processing
-                    row_dict = row.to_dict()
-                    # Apply transformation
-                    transformed_row = expression.evaluate(row_dict)
-                    transformed_rows.append(transformed_row)
-
-                # Store transformed rows in session state
+                # Store transformed rows in session state; outputs are rebuilt lazily
                 st.session_state["transformed_rows"] = transformed_rows
+                st.session_state["transformed_columns"] = columns
+                st.session_state["transform_version"] = (
+                    st.session_state.get("transform_version", 0) + 1
+                )
 
                 # Display success message
                 st.success(
                     f"Successfully transformed {len(transformed_rows)} rows using JSONata"
                 )
+                if errors:
+                    st.warning(f"{len(errors)} rows could not be transformed")
+                    row_ids = (
+                        resolve_path(df, id_key) if has_path(df, id_key) else None
+                    )
+                    st.dataframe(
+                        pd.DataFrame(
+                            {
+                                "Row": [position for position, _ in errors],
+                                "ID": [
+                                    (
+                                        row_ids.iat[position]
+                                        if row_ids is not None
+                                        else None
+                                    )
+                                    for position, _ in errors
+                                ],
+                                "Error": [message for _, message in errors],
+                            }
+                        )
+                    )
 
                 # Display preview of transformed data
                 st.write("Preview of transformed data:")
-                preview_df = pd.DataFrame(transformed_rows)
-                st.dataframe(
-                    preview_df.head(5) if len(transformed_rows) > 5 else preview_df
-                )
+                preview_df = pd.DataFrame(transformed_rows[:5])
+                st.dataframe(preview_df)
 
             except Exception as e:
                 st.error(f"Error transforming data: {str(e)}")
         else:
             st.warning("No data available. Please upload a file first.")
 
-    # Add a download button for CSV
+    # Add a download button for the transformed rows
     if (
         "transformed_rows" in st.session_state
         and len(st.session_state["transformed_rows"]) > 0
     ):
-        # Create CSV from transformed rows
-        def convert_to_csv(transformed_rows):
-            # Get all keys from all dictionaries to ensure all columns are included
-            all_keys = set()
-            for row in transformed_rows:
-                all_keys.update(row.keys())
-
-            fieldnames = list(all_keys)
-
-            # Create CSV in memory
-            csv_buffer = io.StringIO()
-            writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(transformed_rows)
-
-            return csv_buffer.getvalue()
+        output_format = st.radio(
+            "Output format", options=list(OUTPUT_FORMATS), horizontal=True
+        )
+        write, suffix, mime = OUTPUT_FORMATS[output_format]
 
-        # Generate CSV data
-        csv_data = convert_to_csv(st.session_state["transformed_rows"])
+        # The output file is written once per transform and format
+        output_key = (st.session_state["transform_version"], output_format)
+        outputs = st.session_state.setdefault("transform_outputs", {})
+        if output_key not in outputs:
+            for stale_key in [key for key in outputs if key[0] != output_key[0]]:
+                stale_path = outputs.pop(stale_key)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            try:
+                with instrument.stage("gencsv.write"):
+                    outputs[output_key] = write(
+                        st.session_state["transformed_rows"],
+                        st.session_state["transformed_columns"],
+                    )
+            except (ImportError, ValueError) as e:
+                st.error(f"Error writing {output_format}: {str(e)}")
+                return
 
         # Display download button
-        st.download_button(
-            label="Download CSV",
-            data=csv_data,
-            file_name="transformed_data.csv",
-            mime="text/csv",
-        )
+        with open(outputs[output_key], "rb") as output_file:
+            st.download_button(
+                label=f"Download {output_format}",
+                data=output_file,
+                file_name=f"transformed_data{suffix}",
+                mime=mime,
+            )
@@ -1,10 +1,61 @@
+import time
+
+# Taken before the other imports so the startup report includes them
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import re
+import os
+import json
 
 from gencsv import gencsv
-from latexall import latexall
-from utils import validate_text
+from latexall import latexall, parser_comparison
+from incremental import ValidationState
+from engine import warm_up_workers
+from supervisor import error_class
+from cache import get_validation_cache
+from loader import read_jsonl, content_digest
+from fetch import fetch_url
+from store import get_dataset_store
+from snapshot import snapshot_key, load_snapshot, extend_snapshot
+from workingset import WorkingSet, parse_ids
+from categories import RECORD_COLUMN, has_path, category_groups
+from downloads import to_jsonl, category_file_name, write_category_zip
+from interfaces import ParseType, SampleMode
+from sampling import (
+    OVERALL,
+    estimate_rates,
+    render_estimate_table,
+    sample_controls,
+    sample_order,
+    validate_sample,
+)
+from utils import parser_status, warm_up
+import instrument
+
+IMPORTS_DONE = time.perf_counter()
+
+# Only sessions with the sidebar toggle on record stage timings, from the next
+# run on; fragment reruns record into the profile of the last full run
+if st.session_state.get("instrument", instrument.enabled()):
+    st.session_state.run_profile = instrument.begin_run()
+else:
+    st.session_state.run_profile = None
+    instrument.bind(None)
+
+
+def load_jsonl(source, name=None):
+    """Stream a JSONL file into a dataframe while showing a progress bar."""
+    progress_bar = st.progress(0.0, text="Loading data...")
+
+    def update(fraction, rows):
+        progress_bar.progress(fraction or 0.0, text=f"Loaded {rows:,} rows")
+
+    try:
+        with instrument.stage("load_jsonl"):
+            return read_jsonl(source, name=name, progress=update)
+    finally:
+        progress_bar.empty()
 
 
 st.title("Remove IDs from export")
@@ -13,23 +64,94 @@ if "df" not in st.session_state:
     st.session_state.df = None
 if "original_df" not in st.session_state:
     st.session_state.original_df = None
+if "working_set" not in st.session_state:
+    st.session_state.working_set = None
+
+
+def set_dataset(lease, dataset_key=None):
+    """Start a new working set over a shared dataset."""
+    # The lease keeps the shared frame resident; the working set only adds a mask
+    st.session_state.dataset_lease = lease
+    working_set = WorkingSet(lease.df, st.session_state.get("id_key", "idx"))
+    st.session_state.working_set = working_set
+    st.session_state.original_df = working_set.base
+    st.session_state.df = working_set.frame()
+    # The content key, so reruns only reload when the data itself changes
+    st.session_state.dataset_key = dataset_key or lease.key
+
+
+def snapshot_paths():
+    return [
+        st.session_state.get("id_key", "idx"),
+        st.session_state.get("category_key", "metadata.sub_category"),
+        st.session_state.get("to_validate_key", "verification"),
+    ]
+
+
+def load_dataset(source_name, dataset_key, load):
+    """Load (or reuse) a dataset and remember how it was obtained."""
+    key = dataset_key
+    if st.session_state.get("use_snapshot") and dataset_key is not None:
+        key = snapshot_key(dataset_key)
+        paths = snapshot_paths()
+        read_records = load
+
+        def load():
+            with instrument.stage("load_snapshot"):
+                return load_snapshot(dataset_key, paths, read_records)
+
+    lease, elapsed, from_cache = get_dataset_store().load(key, load, source_name)
+    set_dataset(lease, dataset_key)
+    st.session_state.load_report = (
+        f"Loaded {len(lease.df):,} rows from {source_name} in {elapsed:.2f}s"
+        + (" (shared with other sessions)" if from_cache else "")
+    )
 
-df = st.session_state.df
-original_df = st.session_state.original_df
 
+def fetch_jsonl(url):
+    """Download (or revalidate) a URL into the fetch cache while showing progress."""
+    progress_bar = st.progress(0.0, text="Downloading...")
+
+    def update(done, total):
+        progress_bar.progress(
+            min(done / total, 1.0) if total else 0.0,
+            text=f"Downloaded {done / 1024 / 1024:,.1f} MB",
+        )
 
+    try:
+        with instrument.stage("fetch_url"):
+            return fetch_url(url, progress=update)
+    finally:
+        progress_bar.empty()
+
+
+st.checkbox(
+    "Columnar snapshot",
+    value=os.environ.get("DATASET_SNAPSHOTS") == "1",
+    key="use_snapshot",
+    help="Applies to the next load. Save the export as a memory-mapped "
+    "snapshot next to the cache, with the ID, category and verification keys "
+    "as columns, so reopening it is near instant. Records are only rebuilt "
+    "when exporting JSONL.",
+)
 url_input = st.text_input("Download from URL (optional)")
 if st.button("Download from URL") and url_input:
     try:
-        df = pd.read_json(url_input, lines=True, dtype=object, convert_dates=False)
-        original_df = df.copy()
+        fetched = fetch_jsonl(url_input)
+        load_dataset(
+            url_input,
+            fetched.cache_key,
+            lambda: load_jsonl(fetched.path, name=url_input),
+        )
+        if fetched.from_cache:
+            st.toast("Export unchanged since the last download")
         st.toast(f"Successfully downloaded data from URL")
-        st.session_state.df = df
-        st.session_state.original_df = original_df
     except Exception as e:
         st.error(f"Error downloading from URL: {str(e)}")
 
-uploaded_file = st.file_uploader("Choose a JSONL file", type="jsonl")
+uploaded_file = st.file_uploader(
+    "Choose a JSONL file", type=["jsonl", "jsonl.gz", "jsonl.zst", "gz", "zst"]
+)
 id_key = st.text_input("ID key", value="idx", key="id_key")
 category_key = st.text_input(
     "Category key", value="metadata.sub_category", key="category_key"
@@ -38,13 +160,76 @@ to_validate_key = st.text_input(
     "Verification key (Latex)", value="verification", key="to_validate_key"
 )
 
+if uploaded_file is not None:
+    # Reruns keep the current working set unless the uploaded content changed;
+    # each upload gets a new file_id, so its digest is only computed once
+    upload_digest = st.session_state.get("upload_digest")
+    if upload_digest is None or upload_digest[0] != uploaded_file.file_id:
+        upload_digest = (
+            uploaded_file.file_id,
+            content_digest(uploaded_file.getbuffer()),
+        )
+        st.session_state.upload_digest = upload_digest
+    upload_key = upload_digest[1]
+    if st.session_state.get("dataset_key") != upload_key:
+        uploaded_file.seek(0)
+        load_dataset(
+            uploaded_file.name,
+            upload_key,
+            lambda: load_jsonl(uploaded_file, name=uploaded_file.name),
+        )
+
+if st.session_state.get("load_report"):
+    st.caption(st.session_state.load_report)
+
+working_set = st.session_state.working_set
+if working_set is None and st.session_state.df is not None:
+    # A frame placed in the session directly (e.g. by an older session) gets a working set too
+    set_dataset(get_dataset_store().put(st.session_state.df, "session"))
+    working_set = st.session_state.working_set
+if working_set is not None and RECORD_COLUMN in working_set.base.columns:
+    # Newly configured keys are flattened into the snapshot; the selection is kept
+    with instrument.stage("extend_snapshot"):
+        extended = extend_snapshot(
+            working_set.base, st.session_state.dataset_key, snapshot_paths()
+        )
+    if extended is not None:
+        lease = get_dataset_store().replace(
+            st.session_state.dataset_lease.key, extended
+        )
+        st.session_state.dataset_lease = lease
+        working_set.rebase(lease.df)
+        st.session_state.original_df = working_set.base
+        st.session_state.df = working_set.frame()
+if working_set is not None and working_set.id_key != id_key:
+    working_set.rekey(id_key)
+
+
+def publish_working_set():
+    """Make the current selection visible to the rest of the app."""
+    with instrument.stage("working_set.frame"):
+        st.session_state.df = working_set.frame()
+
+
+def validate_all_rows():
+    st.session_state.validation_sample_mode = SampleMode.ALL
+
+
+def download_working_set(label, file_name, key):
+    with instrument.stage("download.to_jsonl"):
+        data = to_jsonl(working_set.frame())
+    st.download_button(
+        label=label,
+        data=data,
+        file_name=file_name,
+        mime="application/jsonl",
+        key=key,
+    )
+
+
 gencsv()
 latexall()
-if uploaded_file is not None:
-    df = pd.read_json(uploaded_file, lines=True, dtype=object, convert_dates=False)
-    original_df = df.copy()
-    st.session_state.df = df
-    st.session_state.original_df = original_df
+parser_comparison()
 
 col1, col2 = st.columns(2)
 with col1:
@@ -52,32 +237,26 @@ with col1:
     ids_to_remove_text = st.text_area("IDs to Remove", value="", key="ids_to_remove")
 
     if st.button("Remove IDs", key="remove_ids"):
-        if df is not None:
+        if working_set is not None:
             # Extract alphanumeric strings with length > 10
-            ids_to_remove = re.findall(r"[a-zA-Z0-9-]{10,}", ids_to_remove_text)
+            ids_to_remove = parse_ids(ids_to_remove_text)
 
             if ids_to_remove:
-                prev_size = len(df)
-                # Filter out rows with matching IDs
-                df = df[~df[id_key].isin(ids_to_remove)]
-                new_size = len(df)
-                df = df.reset_index(drop=True)
-                if len(ids_to_remove) != prev_size - new_size:
-                    message = f"Pasted {len(ids_to_remove)} IDs, but only {prev_size - new_size} were removed"
+                with instrument.stage("id_filters.remove"):
+                    removed = working_set.remove(ids_to_remove)
+                if len(ids_to_remove) != removed:
+                    message = f"Pasted {len(ids_to_remove)} IDs, but only {removed} were removed"
                 else:
-                    message = f"Found and removed {(prev_size - new_size)} IDs"
+                    message = f"Found and removed {removed} IDs"
                 st.toast(message)
                 st.write(message)
-                st.session_state.df = df
+                publish_working_set()
 
                 # Add download button for the filtered data
-                jsonl_data = df.to_json(orient="records", lines=True)
-                st.download_button(
-                    label="Download filtered data",
-                    data=jsonl_data,
-                    file_name="filtered_data_after_remove.jsonl",
-                    mime="application/jsonl",
-                    key="download_after_remove",
+                download_working_set(
+                    "Download filtered data",
+                    "filtered_data_after_remove.jsonl",
+                    "download_after_remove",
                 )
             else:
                 st.toast("No valid IDs found to remove")
@@ -87,38 +266,29 @@ with col2:
     ids_to_add_text = st.text_area("IDs to add", value="", key="ids_to_add")
 
     if st.button("Add IDs", key="add_ids"):
-        if original_df is not None:
+        if working_set is not None:
             # Extract alphanumeric strings with length > 10
-            ids_to_add = re.findall(r"[a-zA-Z0-9]{10,}", ids_to_add_text)
+            ids_to_add = parse_ids(ids_to_add_text, allow_dash=False)
 
             if ids_to_add:
-                df = st.session_state.df
-                # Find rows in original_df that match the IDs and aren't already in df
-                rows_to_add = original_df[original_df[id_key].isin(ids_to_add)]
-                # Only add rows that aren't already in the current df
-                rows_to_add = rows_to_add[~rows_to_add[id_key].isin(df[id_key])]
-
-                if not rows_to_add.empty:
-                    prev_size = len(df)
-                    df = pd.concat([df, rows_to_add], ignore_index=False)
-                    new_size = len(df)
-                    df = df.reset_index(drop=True)
-                    if len(ids_to_add) != new_size - prev_size:
-                        message = f"Pasted {len(ids_to_add)} IDs, but only {new_size - prev_size} were added"
+                # Only rows of the original file that aren't already selected are added
+                with instrument.stage("id_filters.add"):
+                    added = working_set.add(ids_to_add)
+
+                if added:
+                    if len(ids_to_add) != added:
+                        message = f"Pasted {len(ids_to_add)} IDs, but only {added} were added"
                     else:
                         message = f"Found and added {len(ids_to_add)} IDs"
                     st.toast(message)
                     st.write(message)
-                    st.session_state.df = df
+                    publish_working_set()
 
                     # Add download button for the updated data
-                    jsonl_data = df.to_json(orient="records", lines=True)
-                    st.download_button(
-                        label="Download updated data",
-                        data=jsonl_data,
-                        file_name="updated_data_after_add.jsonl",
-                        mime="application/jsonl",
-                        key="download_after_add",
+                    download_working_set(
+                        "Download updated data",
+                        "updated_data_after_add.jsonl",
+                        "download_after_add",
                     )
                 else:
                     st.toast("No new IDs to add")
@@ -127,34 +297,26 @@ with col2:
 
 st.header("Extract IDs")
 ids_to_extract = st.text_area("IDs to Extract", value="", key="ids_to_extract")
-extract_col1, extract_col2 = st.columns([1, 3])
+extract_col1, extract_col2, extract_col3 = st.columns([1, 2, 1])
 with extract_col1:
     if st.button("Extract IDs", key="extract_ids"):
-        if df is not None:
+        if working_set is not None:
             # Extract alphanumeric strings with length > 10
-            ids_to_extract_list = re.findall(r"[a-zA-Z0-9-]{10,}", ids_to_extract)
+            ids_to_extract_list = parse_ids(ids_to_extract)
 
             if ids_to_extract_list:
-                prev_size = len(df)
-                # Filter to only include rows with matching IDs
-                df = df[df[id_key].isin(ids_to_extract_list)]
-                new_size = len(df)
-                df = df.reset_index(drop=True)
+                with instrument.stage("id_filters.extract"):
+                    new_size = working_set.extract(ids_to_extract_list)
                 if len(ids_to_extract_list) != new_size:
                     message = f"Pasted {len(ids_to_extract_list)} IDs, but only {new_size} were extracted"
                 else:
                     message = f"Found and extracted {len(ids_to_extract_list)} IDs"
                 st.toast(message)
                 st.write(message)
-                st.session_state.df = df
-
-                jsonl_data = df.to_json(orient="records", lines=True)
-                st.download_button(
-                    label="Download extracted data",
-                    data=jsonl_data,
-                    file_name="extracted_data.jsonl",
-                    mime="application/jsonl",
-                    key="download_extracted",
+                publish_working_set()
+
+                download_working_set(
+                    "Download extracted data", "extracted_data.jsonl", "download_extracted"
                 )
 
             else:
@@ -162,49 +324,66 @@ with extract_col1:
 
 with extract_col2:
     if st.button("Restore Original File", key="restore_file"):
-        if original_df is not None:
-            df = original_df.copy()
-            df = df.reset_index(drop=True)
+        if working_set is not None:
+            working_set.restore()
             st.toast("Restored original file")
             st.write("Original file has been restored")
-            st.session_state.df = df
+            publish_working_set()
+
+with extract_col3:
+    undo_col, redo_col = st.columns(2)
+    if undo_col.button(
+        "Undo", key="undo", disabled=working_set is None or not working_set.can_undo
+    ):
+        working_set.undo()
+        publish_working_set()
+        st.rerun()
+    if redo_col.button(
+        "Redo", key="redo", disabled=working_set is None or not working_set.can_redo
+    ):
+        working_set.redo()
+        publish_working_set()
+        st.rerun()
+
+df = st.session_state.df
 
 if df is not None:
     # Display the data editor
     st.header("All Data")
-    st.dataframe(df)
+    with instrument.stage("render.all_data"):
+        st.dataframe(df)
 
-if df is not None and category_key is not None and category_key not in df.columns:
+if df is not None and category_key is not None and not has_path(df, category_key):
     st.toast(f"No category key found: {category_key}")
     st.write(f"No category key found: {category_key}")
 elif df is not None:
     # Display number of unique items per category
     st.header("Category Statistics")
-    # Extract the category from nested JSON if needed
-    if "." in category_key:
-        parts = category_key.split(".")
-        category_values = df[parts[0]].apply(
-            lambda x: x.get(parts[1]) if isinstance(x, dict) else None
-        )
-    else:
-        category_values = df[category_key]
+    # Resolve the (possibly nested) category once and group the rows in one pass
+    with instrument.stage("category_stats"):
+        category_values = working_set.column(category_key)
+        category_positions = category_groups(category_values)
 
     # Count unique items per category
-    category_counts = category_values.value_counts().reset_index()
-    category_counts.columns = ["Category", "Count"]
-
-    # Add a total row
-    total_row = pd.DataFrame({"Category": ["All"], "Count": [len(df)]})
-    category_counts = pd.concat([category_counts, total_row], ignore_index=True)
-
-    # Display as a bar chart (excluding the "All" category)
-    st.bar_chart(
-        category_counts[category_counts["Category"] != "All"].set_index("Category")
+    category_counts = pd.DataFrame(
+        {
+            "Category": list(category_positions) + ["All"],
+            "Count": [len(rows) for rows in category_positions.values()] + [len(df)],
+        }
     )
 
-    # Create a dataframe for display with download buttons
-    display_df = category_counts.copy()
-    display_df["Download"] = None  # Placeholder column for buttons
+    # Display as a bar chart (excluding the "All" category)
+    st.bar_chart(category_counts.iloc[:-1].set_index("Category"))
+
+    # Payloads are only serialized on request and kept until the working set changes
+    export_version = (id(working_set), working_set.version, category_key)
+    if st.session_state.get("export_version") != export_version:
+        stale_zip = st.session_state.get("export_payloads", {}).get("zip")
+        if stale_zip and os.path.exists(stale_zip):
+            os.remove(stale_zip)
+        st.session_state.export_version = export_version
+        st.session_state.export_payloads = {}
+    export_payloads = st.session_state.export_payloads
 
     # Display the table with the statistics and download buttons
     st.write(f"Number of unique items per {category_key}:")
@@ -216,48 +395,52 @@ elif df is not None:
     cols[2].write("**Download**")
 
     # Display each row with a download button
-    for idx, row in display_df.iterrows():
-        category = row["Category"]
-        count = row["Count"]
-
+    for idx, (category, count) in enumerate(
+        zip(category_counts["Category"], category_counts["Count"])
+    ):
         # Create columns for each row
         cols = st.columns([3, 1, 2])
         cols[0].write(category)
         cols[1].write(count)
 
-        # Filter data for this category
-        if category == "All":
-            filtered_data = df
-        else:
-            if "." in category_key:
-                parts = category_key.split(".")
-                filtered_data = df[
-                    df[parts[0]].apply(
-                        lambda x: (
-                            x.get(parts[1]) == category
-                            if isinstance(x, dict)
-                            else False
-                        )
-                    )
-                ]
-            else:
-                filtered_data = df[df[category_key] == category]
+        if idx not in export_payloads:
+            if not cols[2].button(f"Prepare {category} items", key=f"prepare_{idx}"):
+                continue
 
-        # Convert to JSONL for download
-        jsonl_data = filtered_data.to_json(orient="records", lines=True)
+            # Filter data for this category and convert it to JSONL
+            if idx == len(category_positions):
+                filtered_data = df
+            else:
+                filtered_data = df.iloc[category_positions[category]]
+            with instrument.stage("download.to_jsonl"):
+                export_payloads[idx] = to_jsonl(filtered_data)
 
         # Create download button
-        download_filename = f"{category.replace(' ', '_').lower()}_items.jsonl"
         cols[2].download_button(
             label=f"Download {category} items",
-            data=jsonl_data,
-            file_name=download_filename,
+            data=export_payloads[idx],
+            file_name=category_file_name(category),
             mime="application/jsonl",
             key=f"download_{idx}",
         )
 
+    if "zip" not in export_payloads:
+        if st.button("Prepare all categories as ZIP", key="prepare_zip"):
+            with st.spinner("Writing ZIP archive..."):
+                with instrument.stage("download.zip"):
+                    export_payloads["zip"] = write_category_zip(df, category_positions)
+    if "zip" in export_payloads:
+        with open(export_payloads["zip"], "rb") as zip_file:
+            st.download_button(
+                label="Download all categories",
+                data=zip_file,
+                file_name="categories.zip",
+                mime="application/zip",
+                key="download_zip",
+            )
+
 
-if df is not None and to_validate_key is not None and to_validate_key not in df.columns:
+if df is not None and to_validate_key is not None and not has_path(df, to_validate_key):
     st.toast(f"No validation key found: {to_validate_key}")
     st.write(f"No validation key found: {to_validate_key}")
 elif df is not None:
@@ -265,48 +448,100 @@ elif df is not None:
     # Add validation table
     st.header("Validation Results")
 
-    # Create validation results
-    validation_results = []
-    for _, row in df.iterrows():
-        id_value = row[id_key]
-
-        # Extract the validation text based on to_validate_key
-        if "." in to_validate_key:
-            parts = to_validate_key.split(".")
-            to_validate = (
-                row[parts[0]].get(parts[1]) if isinstance(row[parts[0]], dict) else None
-            )
-        else:
-            to_validate = row.get(to_validate_key, "")
-
-        # Validate the text
-        is_valid, is_number, error = validate_text(to_validate)
-
-        validation_results.append(
-            {
-                "ID": id_value,
-                "Value": to_validate,
-                "Is LaTeX": is_valid,
-                "Is Number": is_number,
-                "Error": error,
+    sample_mode, sample_size, sample_seconds = sample_controls("validation")
+
+    # Extract the validation text based on to_validate_key
+    values_to_validate = working_set.column(to_validate_key).tolist()
+    id_values = working_set.column(id_key).tolist()
+
+    # Only rows that are new or whose value changed since the last rerun are validated
+    if "validation_state" not in st.session_state or st.session_state.get(
+        "validation_state_keys"
+    ) != (id_key, to_validate_key):
+        st.session_state.validation_state = ValidationState()
+        st.session_state.validation_state_keys = (id_key, to_validate_key)
+    validation_state = st.session_state.validation_state
+    sample_positions = None
+    if sample_mode == SampleMode.ALL:
+        with instrument.stage("validation.sync"):
+            row_results = validation_state.sync(id_values, values_to_validate)
+    else:
+        categories = None
+        if category_key and has_path(df, category_key):
+            categories = working_set.column(category_key).tolist()
+        stratified = sample_mode == SampleMode.STRATIFIED and categories is not None
+        if sample_mode == SampleMode.STRATIFIED and categories is None:
+            st.warning(f"No category key found: {category_key}; sampling at random")
+
+        # The order is fixed per working set, so reruns and larger samples extend it
+        order_key = (id(working_set), working_set.version, stratified, category_key)
+        sample = st.session_state.get("validation_sample")
+        if sample is None or sample["order_key"] != order_key:
+            sample = st.session_state.validation_sample = {
+                "order_key": order_key,
+                "order": sample_order(
+                    len(id_values), categories if stratified else None
+                ),
+                "budget_key": None,
+                "rows": 0,
             }
-        )
+        # A time budget is spent once; reruns keep the rows it reached
+        budget_key = (sample_size, sample_seconds)
+        if sample["budget_key"] == budget_key:
+            size, seconds = sample["rows"], None
+        else:
+            size, seconds = sample_size, sample_seconds
+        with instrument.stage("validation.sample"):
+            sample_positions, row_results = validate_sample(
+                validation_state,
+                id_values,
+                values_to_validate,
+                sample["order"],
+                size,
+                seconds,
+            )
+        sample["budget_key"] = budget_key
+        sample["rows"] = len(sample_positions)
+
+        total_rows = len(id_values)
+        id_values = [id_values[p] for p in sample_positions]
+        values_to_validate = [values_to_validate[p] for p in sample_positions]
 
     # Create validation dataframe
-    validation_df = pd.DataFrame(validation_results)
+    validation_df = pd.DataFrame(
+        {
+            "ID": id_values,
+            "Value": values_to_validate,
+            "Is LaTeX": [result[0] for result in row_results],
+            "Is Number": [result[1] for result in row_results],
+            "Error": [result[2] for result in row_results],
+            "Error Class": [error_class(result[2]) for result in row_results],
+        }
+    )
 
     if not validation_df.empty:
         # Display validation table
         st.dataframe(validation_df)
 
         # Display validation summary
-        st.subheader("Validation Summary")
-        total_count = len(validation_df)
-        valid_latex_count = validation_df["Is LaTeX"].sum()
-        number_count = validation_df["Is Number"].sum()
+        summary = validation_state.summary()
+        total_count = summary["total"]
+        valid_latex_count = summary["valid"]
+        number_count = summary["numbers"]
+        if sample_positions is None:
+            st.subheader("Validation Summary")
+            total_label = "Total Items"
+        else:
+            # Counts of the sampled rows only; the estimates below cover the whole set
+            st.subheader("Sample Summary")
+            st.caption(
+                f"Counts over the {total_count:,} sampled rows of {total_rows:,}; "
+                "see Sample Estimates for the rates in the whole dataset"
+            )
+            total_label = "Sampled Items"
 
         summary_data = {
-            "Metric": ["Total Items", "Valid LaTeX", "Numbers"],
+            "Metric": [total_label, "Valid LaTeX", "Numbers"],
             "Count": [total_count, valid_latex_count, number_count],
             "Percentage": [
                 "100%",
@@ -321,3 +556,142 @@ elif df is not None:
 
         summary_df = pd.DataFrame(summary_data)
         st.table(summary_df)
+
+        if sample_positions is not None:
+            st.subheader("Sample Estimates")
+            estimates = estimate_rates(
+                {
+                    "Valid LaTeX": [result[0] for result in row_results],
+                    "Numbers": [result[1] for result in row_results],
+                },
+                [categories[p] for p in sample_positions] if categories else None,
+                (
+                    {
+                        category: len(rows)
+                        for category, rows in category_groups(
+                            working_set.column(category_key)
+                        ).items()
+                    }
+                    if categories
+                    else {OVERALL: total_rows}
+                ),
+            )
+            render_estimate_table(
+                estimates,
+                f"{len(sample_positions):,} of {total_rows:,} rows sampled "
+                f"({sample_mode.value.lower()})",
+            )
+            # Sampled rows keep their results, so only the remaining rows are validated
+            st.button(
+                "Validate the rest", key="validate_rest", on_click=validate_all_rows
+            )
+
+        cache_stats = get_validation_cache().stats()
+        st.caption(
+            f"Validation cache: {cache_stats['hits']} hits "
+            f"({cache_stats['disk_hits']} from disk), {cache_stats['misses']} misses; "
+            f"{validation_state.last_validated} rows revalidated this run"
+        )
+
+
+# Everything above has been sent to the browser, so loading a parser no longer
+# delays the first paint
+worker_status = {}
+if st.sidebar.checkbox("Warm up parser in background", value=True, key="warm_up"):
+    latex_parse_type = ParseType(
+        st.session_state.get("latex_parse_type", ParseType.PYLATEXENC)
+    )
+    # The LaTeX page editor validates in this process; batches, including the
+    # Validation Results (sympy-antlr), go to supervised workers
+    warm_up(latex_parse_type)
+    worker_status = warm_up_workers(
+        dict.fromkeys([ParseType.SYMPY_ANTLR, latex_parse_type])
+    )
+
+if "startup_timing" not in st.session_state:
+    st.session_state.startup_timing = (
+        IMPORTS_DONE - SCRIPT_STARTED,
+        time.perf_counter() - SCRIPT_STARTED,
+    )
+with st.sidebar.expander("Startup timing"):
+    imports_seconds, first_run_seconds = st.session_state.startup_timing
+    timing = {
+        "App imports": f"{imports_seconds:.2f}s",
+        "First run": f"{first_run_seconds:.2f}s",
+    }
+    for parser, status in parser_status().items():
+        timing[f"{parser.value} parser"] = (
+            f"{status:.2f}s" if isinstance(status, float) else status or "not loaded"
+        )
+    for parse_type, status in worker_status.items():
+        timing[f"{parse_type.value} in validation worker"] = (
+            f"{status:.2f}s" if isinstance(status, float) else status
+        )
+    st.table(pd.DataFrame({"Stage": timing.keys(), "Time": timing.values()}))
+
+with st.sidebar.expander("Debug: instrumentation"):
+    st.checkbox(
+        "Record stage timings",
+        value=instrument.enabled(),
+        key="instrument",
+        help="Applies to this session, from the next rerun on",
+    )
+    profile = st.session_state.run_profile
+    if profile is not None:
+        profile.add("script", time.perf_counter() - SCRIPT_STARTED, None)
+        stages = profile.as_dict()["stages"]
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Stage": list(stages),
+                    "Calls": [stage["calls"] for stage in stages.values()],
+                    "Time (ms)": [
+                        round(stage["seconds"] * 1000, 1) for stage in stages.values()
+                    ],
+                    "Memory (MB)": [
+                        round(stage["memory_mb"], 1) for stage in stages.values()
+                    ],
+                }
+            ),
+            hide_index=True,
+        )
+        histograms = instrument.parse_histograms()
+        if histograms:
+            st.write("Parse latency (expressions per bucket)")
+            st.dataframe(pd.DataFrame(histograms, index=instrument.bucket_labels()))
+        elif not instrument.enabled():
+            st.caption("Set APP_INSTRUMENT=1 to record parse latency for the server")
+        st.download_button(
+            "Export JSON",
+            data=json.dumps(instrument.report(profile), indent=2),
+            file_name="instrumentation.json",
+            mime="application/json",
+            key="export_instrumentation",
+        )
+
+with st.sidebar.expander("Dataset store"):
+    dataset_store = get_dataset_store()
+    resident = dataset_store.stats()
+    budget_mb = dataset_store.budget_bytes / 1024 / 1024
+    st.caption(
+        f"{len(resident)} datasets, {dataset_store.nbytes / 1024 / 1024:,.1f} MB resident"
+        + (f" of {budget_mb:,.0f} MB budget" if budget_mb > 0 else "")
+    )
+    if resident:
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Source": [entry["source"] for entry in resident],
+                    "Rows": [entry["rows"] for entry in resident],
+                    "Size (MB)": [round(entry["mb"], 1) for entry in resident],
+                    "Sessions": [entry["sessions"] for entry in resident],
+                    "Last used": [
+                        time.strftime("%H:%M:%S", time.localtime(entry["last_used"]))
+                        for entry in resident
+                    ],
+                }
+            ),
+            hide_index=True,
+        )
+    if st.button("Evict unused datasets", key="evict_datasets"):
+        st.toast(f"Evicted {dataset_store.evict_unused()} datasets")
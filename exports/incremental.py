@@ -0,0 +1,88 @@
+import hashlib
+import json
+from collections import Counter
+
+from interfaces import ParseType
+from engine import validate_batch
+from supervisor import is_supervision_error
+
+
+def content_hash(value) -> bytes:
+    """Cheap, stable digest of a cell value."""
+    if isinstance(value, str):
+        data = value.encode("utf-8", "surrogatepass")
+    else:
+        # Tagged so that e.g. the number 1 and the string "1" hash differently
+        data = b"\0" + json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class ValidationState:
+    """
+    Per-row validation results keyed by (row ID, hash of the validated value).
+
+    `sync` is called with the current rows on every rerun. Rows whose key has
+    been seen before reuse their stored result; only new or edited rows are
+    validated. The summary counts are adjusted by the rows that entered or left
+    the frame instead of being recomputed. Rows that timed out or hit the memory
+    cap are validated again on the next sync.
+    """
+
+    def __init__(self, parse_type: ParseType = ParseType.SYMPY_ANTLR):
+        self.parse_type = ParseType(parse_type)
+        self.total = 0
+        self.valid = 0
+        self.numbers = 0
+        self.last_validated = 0
+        self._results = {}
+        # Keys whose stored result is a timeout or resource failure
+        self._retry = set()
+        self._present = Counter()
+
+    def _apply(self, key, sign: int):
+        is_valid, is_number, _ = self._results[key][:3]
+        self.total += sign
+        self.valid += sign * bool(is_valid)
+        self.numbers += sign * bool(is_number)
+
+    def sync(self, ids: list, values: list) -> list[tuple]:
+        """
+        Bring the state in line with the given rows.
+
+        Args:
+            ids: Row IDs, in frame order
+            values: Values to validate, aligned with `ids`
+
+        Returns:
+            list[tuple]: (is_valid, is_number, error) for each row, in order
+        """
+        keys = [(row_id, content_hash(value)) for row_id, value in zip(ids, values)]
+
+        missing = {}
+        for key, value in zip(keys, values):
+            if (key not in self._results or key in self._retry) and key not in missing:
+                missing[key] = value
+        if missing:
+            validated = validate_batch(list(missing.values()), self.parse_type)
+            for key, result in zip(missing, validated):
+                # Uncount the result being replaced; the deltas below count the new one
+                for _ in range(self._present.pop(key, 0)):
+                    self._apply(key, -1)
+                self._results[key] = result
+                if is_supervision_error(result):
+                    self._retry.add(key)
+                else:
+                    self._retry.discard(key)
+        self.last_validated = len(missing)
+
+        present = Counter(keys)
+        for key in present.keys() | self._present.keys():
+            delta = present[key] - self._present[key]
+            for _ in range(abs(delta)):
+                self._apply(key, 1 if delta > 0 else -1)
+        self._present = present
+
+        return [self._results[key] for key in keys]
+
+    def summary(self) -> dict:
+        return {"total": self.total, "valid": self.valid, "numbers": self.numbers}
@@ -0,0 +1,177 @@
+import functools
+import os
+import threading
+import time
+
+
+# Upper bounds of the parse latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = [0.1, 0.3, 1, 3, 10, 30, 100, 300, 1_000, 3_000, 10_000]
+
+_enabled = os.environ.get("APP_INSTRUMENT") == "1"
+_local = threading.local()
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def enabled() -> bool:
+    """Whether parse latency is recorded, for the whole process."""
+    return _enabled
+
+
+def set_enabled(flag: bool):
+    """Turn parse latency recording on or off for the whole process."""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def rss_mb() -> float | None:
+    """Resident memory of this process in MB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RunProfile:
+    """Wall time, call counts and memory deltas per stage of one script run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, memory_mb: float | None):
+        with self._lock:
+            stage = self.stages.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "memory_mb": 0.0}
+            )
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            if memory_mb is not None:
+                stage["memory_mb"] += memory_mb
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started": self.started,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            }
+
+
+class _Stage:
+    __slots__ = ("profile", "name", "started", "rss")
+
+    def __init__(self, profile: RunProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.rss = rss_mb()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        rss = rss_mb()
+        memory = rss - self.rss if rss is not None and self.rss is not None else None
+        self.profile.add(self.name, seconds, memory)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def begin_run() -> RunProfile:
+    """Start a new profile and record this thread's stages into it."""
+    profile = RunProfile()
+    _local.profile = profile
+    return profile
+
+
+def bind(profile: RunProfile | None):
+    """Record this thread's stages into an existing profile (e.g. from a fragment rerun)."""
+    _local.profile = profile
+
+
+def stage(name: str):
+    """
+    Context manager timing a named stage of the current run.
+
+    When the thread has no profile (a session that did not opt in, or a
+    background validation job), a shared no-op context is returned.
+    """
+    profile = getattr(_local, "profile", None)
+    if profile is None:
+        return _NO_STAGE
+    return _Stage(profile, name)
+
+
+def timed(name: str):
+    """Decorator form of `stage`."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_parse(parse_type, seconds: float):
+    """Add one parse to the latency histogram of `parse_type`."""
+    milliseconds = seconds * 1000
+    bucket = len(LATENCY_BUCKETS_MS)
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if milliseconds <= bound:
+            bucket = i
+            break
+    key = getattr(parse_type, "value", str(parse_type))
+    with _histograms_lock:
+        counts = _histograms.setdefault(key, [0] * (len(LATENCY_BUCKETS_MS) + 1))
+        counts[bucket] += 1
+
+
+def bucket_labels() -> list[str]:
+    labels = [f"<= {bound:g} ms" for bound in LATENCY_BUCKETS_MS]
+    return labels + [f"> {LATENCY_BUCKETS_MS[-1]:g} ms"]
+
+
+def parse_histograms() -> dict:
+    """ParseType value -> parse counts per latency bucket, since the process started."""
+    with _histograms_lock:
+        return {key: list(counts) for key, counts in _histograms.items()}
+
+
+def reset_histograms():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def report(profile: RunProfile | None) -> dict:
+    """Stages of `profile` and the parse latency histograms, ready for JSON."""
+    return {
+        "run": profile.as_dict() if profile is not None else None,
+        "parse_latency": {
+            "buckets": bucket_labels(),
+            "counts": parse_histograms(),
+        },
+    }
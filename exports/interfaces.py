@@ -5,3 +5,25 @@ class ParseType(str, Enum):
     PYLATEXENC = "pylatexenc"
     SYMPY_LARK = "sympy-lark"
     SYMPY_ANTLR = "sympy-antlr"
+    CASCADE = "cascade"
+    CASCADE_PYLATEXENC = "cascade-pylatexenc"
+    CASCADE_STRUCTURE = "cascade-structure"
+
+
+class CascadeTier(str, Enum):
+    STRUCTURE = "structure"
+    PYLATEXENC = "pylatexenc"
+    SYMPY = "sympy"
+
+
+class MathDelimiter(str, Enum):
+    DOUBLE_DOLLAR = "$$"
+    BRACKET = "\\["
+    DOLLAR = "$"
+    PAREN = "\\("
+
+
+class SampleMode(str, Enum):
+    ALL = "All rows"
+    RANDOM = "Random sample"
+    STRATIFIED = "Stratified by category"
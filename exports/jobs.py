@@ -0,0 +1,201 @@
+import threading
+import time
+
+from engine import validate_batch
+from interfaces import CascadeTier, ParseType
+from utils import extract_data_math_expressions
+
+
+# Rows per validate_batch call; smaller batches surface the first errors sooner
+JOB_BATCH_ROWS = 500
+# Smaller batches while sampling against a time budget, so it is not overrun by much
+SAMPLE_BATCH_ROWS = 50
+
+
+def faulty_rows(row_expressions: list, results: list) -> list[dict]:
+    """
+    Pair per-row expressions with their validation results, keeping rows with errors.
+
+    Args:
+        row_expressions: (row id, expressions) pairs
+        results: Validation results for all expressions, in the same order
+
+    Returns:
+        list[dict]: {"id", "error_count", "faulty_expressions"} per faulty row
+    """
+    validated = iter(results)
+    rows = []
+    for row_id, expressions in row_expressions:
+        faulty_expressions = []
+        for expr in expressions:
+            result = next(validated)
+            if not result[0]:
+                error_msg = result[2]
+                # Cascade results also say which tier rejected the expression
+                if len(result) > 3:
+                    error_msg = f"[{CascadeTier(result[3]).value}] {error_msg}"
+                faulty_expressions.append({"expression": expr, "error": error_msg})
+        if faulty_expressions:
+            rows.append(
+                {
+                    "id": row_id,
+                    "error_count": len(faulty_expressions),
+                    "faulty_expressions": faulty_expressions,
+                }
+            )
+    return rows
+
+
+class ValidationJob:
+    """
+    Validate the math in a list of rows on a background thread.
+
+    Rows are processed in batches; faulty rows are appended to `results` as
+    each batch finishes, so they can be shown while the job is still running.
+    A cancelled job keeps its position and can be resumed with `start()`.
+
+    `sample()` stops early after a number of rows or seconds, with the status
+    "sampled"; pass rows in a sample order (see sampling.sample_order) to
+    make the rows done a sample, and `start()` to validate the rest.
+    """
+
+    def __init__(
+        self,
+        row_ids: list,
+        row_values: list,
+        parse_type: ParseType = ParseType.SYMPY_ANTLR,
+        batch_rows: int = JOB_BATCH_ROWS,
+    ):
+        self.row_ids = row_ids
+        self.row_values = row_values
+        self.parse_type = ParseType(parse_type)
+        self.batch_rows = batch_rows
+        self.next_row = 0
+        self.expressions_done = 0
+        self.results = []
+        self.status = "pending"
+        self.error = None
+        self._elapsed = 0.0
+        self._run_started = None
+        self._run_start_row = 0
+        self._stop_row = None
+        self._deadline = None
+        self._cancel = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def total_rows(self) -> int:
+        return len(self.row_ids)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the job, or resume it from the first unvalidated row."""
+        self._start(None, None)
+
+    def sample(self, rows: int | None = None, seconds: float | None = None):
+        """Validate at most `rows` more rows, stopping after `seconds` if given."""
+        self._start(
+            self.next_row + rows if rows else None,
+            time.perf_counter() + seconds if seconds else None,
+        )
+
+    def _start(self, stop_row: int | None, deadline: float | None):
+        if self.running or self.status == "done":
+            return
+        self._stop_row = stop_row
+        self._deadline = deadline
+        self._cancel.clear()
+        self.status = "running"
+        self.error = None
+        self._run_started = time.perf_counter()
+        self._run_start_row = self.next_row
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop after the batch in progress; already found errors are kept."""
+        self._cancel.set()
+
+    def _validate(self, row_expressions: list, expressions: list) -> list[dict]:
+        """Validate one batch of extracted expressions; returns rows for `results`."""
+        return faulty_rows(
+            row_expressions, validate_batch(expressions, self.parse_type)
+        )
+
+    def _run(self):
+        try:
+            stop_row = min(self._stop_row or self.total_rows, self.total_rows)
+            batch_rows = self.batch_rows
+            if self._deadline is not None:
+                batch_rows = min(batch_rows, SAMPLE_BATCH_ROWS)
+            while self.next_row < stop_row and not self._cancel.is_set():
+                if self._deadline is not None and time.perf_counter() >= self._deadline:
+                    break
+                end = min(self.next_row + batch_rows, stop_row)
+                row_expressions = [
+                    (row_id, extract_data_math_expressions(values))
+                    for row_id, values in zip(
+                        self.row_ids[self.next_row : end],
+                        self.row_values[self.next_row : end],
+                    )
+                ]
+                expressions = [expr for _, exprs in row_expressions for expr in exprs]
+                rows = self._validate(row_expressions, expressions)
+                with self._lock:
+                    self.results.extend(rows)
+                    self.expressions_done += len(expressions)
+                    self.next_row = end
+            if self.next_row >= self.total_rows:
+                self.status = "done"
+            elif self._cancel.is_set():
+                self.status = "cancelled"
+            else:
+                self.status = "sampled"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            with self._lock:
+                self._elapsed += time.perf_counter() - self._run_started
+                self._run_started = None
+
+    def snapshot(self) -> list[dict]:
+        """Faulty rows found so far."""
+        with self._lock:
+            return list(self.results)
+
+    def progress(self) -> dict:
+        """
+        Progress of the job.
+
+        Returns:
+            dict: rows_done, total_rows, fraction, expressions_done, rate
+                (expressions per second) and eta (seconds, None when unknown)
+        """
+        with self._lock:
+            elapsed = self._elapsed
+            run_rows = 0
+            run_elapsed = 0.0
+            if self._run_started is not None:
+                run_elapsed = time.perf_counter() - self._run_started
+                elapsed += run_elapsed
+                run_rows = self.next_row - self._run_start_row
+            rows_done = self.next_row
+            expressions_done = self.expressions_done
+
+        total = self.total_rows
+        eta = None
+        if run_rows and run_elapsed:
+            eta = (total - rows_done) * run_elapsed / run_rows
+        return {
+            "rows_done": rows_done,
+            "total_rows": total,
+            "fraction": rows_done / total if total else 1.0,
+            "expressions_done": expressions_done,
+            "rate": expressions_done / elapsed if elapsed else 0.0,
+            "eta": eta,
+        }
@@ -1,9 +1,39 @@
+import math
 import re
 import streamlit as st
 import json
+import pandas as pd
 
-from utils import validate_text, extract_math_expressions, extract_all_text
-from interfaces import ParseType
+from utils import validate_text
+from jobs import ValidationJob
+from compare import ComparisonJob, DEFAULT_COMPARE_PARSERS
+from categories import has_path, resolve_path, category_groups
+from sampling import (
+    OVERALL,
+    estimate_rates,
+    render_estimate_table,
+    sample_controls,
+    sample_order,
+)
+from snapshot import iter_records
+from supervisor import error_class, TIMEOUT_ERROR, RESOURCE_ERROR
+from interfaces import ParseType, SampleMode
+import instrument
+
+
+# Seconds between progress refreshes while a validation job runs
+POLL_SECONDS = 1.0
+PAGE_SIZES = [25, 50, 100, 250]
+SUMMARY_CHARS = 120
+# Disagreeing expressions listed in the comparison table
+MAX_COMPARE_ROWS = 1_000
+# Sort option -> summary table columns (None keeps the order rows were found in)
+SORT_COLUMNS = {
+    "Row order": None,
+    "ID": ["ID", "#"],
+    "Errors in row": ["Errors in Row", "_row", "#"],
+    "Error class": ["Class", "_row", "#"],
+}
 
 
 @st.fragment
@@ -30,80 +60,417 @@ def latex_expression_editor(
 
     # Add validation button
     if st.button("Validate edited expression", key=f"validate_{key_prefix}"):
-        is_valid, _, new_error_msg = validate_text(edited_expr, parse_type)
+        result = validate_text(edited_expr, parse_type)
+        is_valid, new_error_msg = result[0], result[2]
         if is_valid:
             st.success("LaTeX expression is now valid!")
         else:
             st.error(f"Still invalid: {new_error_msg}")
 
 
-@st.fragment
-def latexall():
+def error_rows(results: list, start: int = 0) -> list[dict]:
+    """
+    One summary row per faulty expression of `results[start:]`.
+
+    Rows point back into `results` through their "_row" and "_expr" columns.
+    """
+    rows = []
+    for row_pos, result in enumerate(results[start:], start):
+        for expr_pos, expr in enumerate(result["faulty_expressions"]):
+            error = expr["error"]
+            rows.append(
+                {
+                    "ID": str(result["id"]),
+                    "#": expr_pos + 1,
+                    "Errors in Row": result["error_count"],
+                    "Class": error_class(error),
+                    "Error": error.splitlines()[0][:SUMMARY_CHARS] if error else "",
+                    "Expression": expr["expression"][:SUMMARY_CHARS],
+                    "_row": row_pos,
+                    "_expr": expr_pos,
+                }
+            )
+    return rows
+
+
+def error_table(job, results: list, sort_by: str, descending: bool) -> pd.DataFrame:
+    """
+    The sorted summary table of `results`, cached in the session.
+
+    Results only grow while `job` runs, so new rows are appended to the
+    cached ones; the table is only rebuilt and sorted again when the number
+    of results or the sort settings change.
+    """
+    cached = st.session_state.get("latex_errors_cache")
+    if cached is None or cached["job"] is not job:
+        cached = {"job": job, "results": 0, "rows": [], "key": None, "table": None}
+        st.session_state["latex_errors_cache"] = cached
+    key = (len(results), sort_by, descending)
+    if cached["key"] == key:
+        return cached["table"]
+
+    cached["rows"].extend(error_rows(results, cached["results"]))
+    cached["results"] = len(results)
+    table = pd.DataFrame(cached["rows"])
+    if SORT_COLUMNS[sort_by] is not None:
+        table = table.sort_values(
+            SORT_COLUMNS[sort_by], ascending=not descending, kind="stable"
+        )
+    elif descending:
+        table = table.iloc[::-1]
+    cached["key"] = key
+    cached["table"] = table
+    return table
+
+
+def render_faulty_rows(job, results: list, parse_type: ParseType):
+    """
+    Show faulty expressions as a paginated, sortable table.
+
+    Only the current page is sent to the browser, and a single editor is
+    mounted for the selected expression, so rendering does not grow with
+    the number of errors.
+    """
     col1, col2, col3 = st.columns(3)
     with col1:
-        is_all = st.checkbox("Validate All keys", value=False)
+        sort_by = st.selectbox("Sort by", SORT_COLUMNS, key="latex_errors_sort")
     with col2:
-        parse_type = st.selectbox("Parse Type", options=ParseType, index=0)
+        page_size = st.selectbox(
+            "Rows per page", PAGE_SIZES, index=1, key="latex_errors_page_size"
+        )
     with col3:
-        if not st.button("Validate Latex"):
-            return
+        descending = st.checkbox("Descending", key="latex_errors_descending")
+    table = error_table(job, results, sort_by, descending)
+
+    pages = max(1, math.ceil(len(table) / page_size))
+    # The page count shrinks when a new job starts or the page size grows
+    if st.session_state.get("latex_errors_page", 1) > pages:
+        st.session_state["latex_errors_page"] = pages
+    page = st.number_input(
+        f"Page (of {pages})", min_value=1, max_value=pages, key="latex_errors_page"
+    )
+    start = (page - 1) * page_size
+    page_table = table.iloc[start : start + page_size]
+    st.caption(
+        f"Showing {start + 1:,}-{start + len(page_table):,} of {len(table):,} "
+        "faulty expressions; select a row to edit it"
+    )
+
+    event = st.dataframe(
+        page_table,
+        column_order=[c for c in page_table.columns if not c.startswith("_")],
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="latex_errors_table",
+    )
+    if not event.selection.rows:
+        return
+
+    selected = page_table.iloc[event.selection.rows[0]]
+    result = results[selected["_row"]]
+    expr_pos = selected["_expr"]
+    expr = result["faulty_expressions"][expr_pos]
+    kind = error_class(expr["error"])
+    label = f" ({kind})" if kind in (TIMEOUT_ERROR, RESOURCE_ERROR) else ""
+    st.markdown(
+        f"**ID: {result['id']} - Error {expr_pos + 1} of {result['error_count']}{label}**"
+    )
+    latex_expression_editor(
+        expr["expression"],
+        expr["error"],
+        f"expr_{result['id']}_{expr_pos}",
+        parse_type,
+    )
+
+
+def format_seconds(seconds: float | None) -> str:
+    if seconds is None:
+        return "--"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def collect_rows(is_all: bool):
+    """
+    IDs and values to validate from the current data, or None after showing why not.
+
+    Args:
+        is_all: Validate every key of each record instead of the verification key
+    """
     if "df" not in st.session_state:
         st.error("No data to validate")
-        return
+        return None
     df = st.session_state["df"]
     to_validate_key = st.session_state["to_validate_key"]
     id_key = st.session_state["id_key"]
-    if id_key not in df.columns:
+    if not has_path(df, id_key):
         st.error(f"ID Column {id_key} not found in data")
-        return
-    if to_validate_key not in df.columns and not is_all:
+        return None
+    if not has_path(df, to_validate_key) and not is_all:
         st.error(f"Verification Column {to_validate_key} not found in data")
-        return
+        return None
 
-    # Extract expressions and validate them
-    results = []
-    faulty_ids_count = 0
-
-    for _, row in df.iterrows():
-        row_id = row[id_key]
+    with instrument.stage("latexall.collect_rows"):
         if is_all:
-            text = extract_all_text(row.to_dict())
+            row_values = [tuple(record.values()) for record in iter_records(df)]
         else:
-            text = row[to_validate_key]
-            text = extract_all_text(text)
-        expressions = extract_math_expressions(text)
-
-        # Validate each expression
-        faulty_expressions = []
-        for expr in expressions:
-            is_valid, _, error_msg = validate_text(expr, parse_type)
-            if not is_valid:
-                faulty_expressions.append({"expression": expr, "error": error_msg})
-
-        # Add to results if there are faulty expressions
-        if faulty_expressions:
-            results.append(
-                {
-                    "id": row_id,
-                    "error_count": len(faulty_expressions),
-                    "faulty_expressions": faulty_expressions,
-                }
-            )
-            faulty_ids_count += 1
+            row_values = resolve_path(df, to_validate_key).tolist()
+    return resolve_path(df, id_key).tolist(), row_values
 
-    # Display results
-    if results:
-        st.write(f"Found {faulty_ids_count}/{len(df)} IDs with LaTeX errors:")
-
-        for result in results:
-            with st.expander(f"ID: {result['id']} - {result['error_count']} errors"):
-                for i, expr in enumerate(result["faulty_expressions"]):
-                    st.markdown(f"**Error {i+1}:**")
-                    expr_key = f"expr_{result['id']}_{i}"
-
-                    # Use a fragment for each expression editor
-                    latex_expression_editor(
-                        expr["expression"], expr["error"], expr_key, parse_type
-                    )
+
+@st.fragment
+def latexall():
+    instrument.bind(st.session_state.get("run_profile"))
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        is_all = st.checkbox("Validate All keys", value=False)
+    with col2:
+        parse_type = st.selectbox(
+            "Parse Type", options=ParseType, index=0, key="latex_parse_type"
+        )
+    with col3:
+        start = st.button("Validate Latex")
+    sample_mode, sample_size, sample_seconds = sample_controls("latex")
+
+    job = st.session_state.get("latex_job")
+    if start:
+        rows = collect_rows(is_all)
+        if rows is None:
+            return
+        if job is not None:
+            job.cancel()
+        # Validation runs on a background thread; this fragment polls its progress
+        if sample_mode == SampleMode.ALL:
+            job = ValidationJob(*rows, parse_type)
+            job.start()
+            st.session_state["latex_job_sample"] = None
+        else:
+            job, sample = sample_job(*rows, parse_type, sample_mode)
+            job.sample(sample_size, sample_seconds)
+            st.session_state["latex_job_sample"] = sample
+        st.session_state["latex_job"] = job
+
+    if job is None:
+        return
+    if job.running:
+        running_job(job)
     else:
+        if job.status == "cancelled":
+            if st.button("Resume validation", key="resume_latex_job"):
+                job.start()
+                st.rerun()
+        elif job.status == "sampled":
+            # The sampled rows come first, so the job carries on after them
+            if st.button("Validate the rest", key="validate_rest_latex_job"):
+                job.start()
+                st.rerun()
+        elif job.status == "failed":
+            st.error(f"Validation failed: {job.error}")
+        render_job(job)
+
+
+def sample_job(row_ids: list, row_values: list, parse_type, sample_mode):
+    """
+    A job over the rows in sample order, and what is needed to estimate from it.
+
+    Returns:
+        tuple: (ValidationJob, {"categories": category per job row or None,
+            "population": category -> rows in the data})
+    """
+    df = st.session_state["df"]
+    category_key = st.session_state.get("category_key")
+    categories = None
+    if category_key and has_path(df, category_key):
+        categories = resolve_path(df, category_key).tolist()
+    elif sample_mode == SampleMode.STRATIFIED:
+        st.warning(f"No category key found: {category_key}; sampling at random")
+
+    stratified = sample_mode == SampleMode.STRATIFIED and categories is not None
+    order = sample_order(len(row_ids), categories if stratified else None)
+    job = ValidationJob(
+        [row_ids[p] for p in order], [row_values[p] for p in order], parse_type
+    )
+    if categories is None:
+        return job, {"categories": None, "population": {OVERALL: len(row_ids)}}
+    population = {
+        category: len(rows)
+        for category, rows in category_groups(
+            pd.Series(categories, dtype=object)
+        ).items()
+    }
+    return job, {
+        "categories": [categories[p] for p in order],
+        "population": population,
+    }
+
+
+def render_estimates(job: ValidationJob, results: list, rows_done: int, sample: dict):
+    """Estimated share of rows without LaTeX errors, from the rows sampled so far."""
+    faulty = {result["id"] for result in results}
+    categories = sample["categories"]
+    estimates = estimate_rates(
+        {
+            "Rows without LaTeX errors": [
+                row_id not in faulty for row_id in job.row_ids[:rows_done]
+            ]
+        },
+        categories[:rows_done] if categories is not None else None,
+        sample["population"],
+    )
+    render_estimate_table(estimates, f"Estimated from {rows_done:,} sampled rows")
+
+
+def render_progress(job: ValidationJob):
+    progress = job.progress()
+    st.progress(
+        progress["fraction"],
+        text=(
+            f"{progress['rows_done']:,}/{progress['total_rows']:,} rows checked, "
+            f"{progress['rate']:,.0f} expressions/s, "
+            f"ETA {format_seconds(progress['eta'])}"
+        ),
+    )
+    return progress
+
+
+@instrument.timed("latexall.render")
+def render_job(job: ValidationJob):
+    progress = render_progress(job)
+
+    results = job.snapshot()
+    sample = st.session_state.get("latex_job_sample")
+    if sample is not None and job.status != "done" and progress["rows_done"]:
+        render_estimates(job, results, progress["rows_done"], sample)
+    if results:
+        st.write(
+            f"Found {len(results)}/{progress['rows_done']} IDs with LaTeX errors"
+            + (":" if job.status == "done" else " so far:")
+        )
+        render_faulty_rows(job, results, job.parse_type)
+    elif job.status == "done":
         st.success("No LaTeX errors found!")
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def running_job(job: ValidationJob):
+    """Refresh the job's progress and the errors found so far until it stops."""
+    instrument.bind(st.session_state.get("run_profile"))
+    if st.button("Cancel validation", key="cancel_latex_job"):
+        job.cancel()
+    if not job.running:
+        # Redraw the whole section once so the polling stops
+        st.rerun()
+    render_job(job)
+
+
+def disagreement_rows(results: list) -> list[dict]:
+    """One row per expression the parsers disagree on, with each parser's error."""
+    rows = []
+    for result in results:
+        for expr in result["expressions"]:
+            row = {"ID": str(result["id"]), "Expression": expr["expression"]}
+            for parser, error in expr["errors"].items():
+                row[parser] = (
+                    error.splitlines()[0][:SUMMARY_CHARS] if error else "valid"
+                )
+            rows.append(row)
+    return rows
+
+
+@st.fragment
+def parser_comparison():
+    """Validate the same rows with several parsers and show where they disagree."""
+    instrument.bind(st.session_state.get("run_profile"))
+    with st.expander("Compare parsers"):
+        col1, col2 = st.columns(2)
+        with col1:
+            parse_types = st.multiselect(
+                "Parsers",
+                options=list(ParseType),
+                default=DEFAULT_COMPARE_PARSERS,
+                format_func=lambda parse_type: parse_type.value,
+                key="compare_parse_types",
+            )
+        with col2:
+            is_all = st.checkbox("Compare All keys", key="compare_all_keys")
+            # Cached results make the timings meaningless
+            skip_cache = st.checkbox(
+                "Time every parse (skip the validation cache)",
+                key="compare_skip_cache",
+            )
+        start = st.button("Compare parsers", key="compare_parsers")
+
+        job = st.session_state.get("compare_job")
+        if start:
+            if len(parse_types) < 2:
+                st.error("Select at least two parsers to compare")
+                return
+            rows = collect_rows(is_all)
+            if rows is None:
+                return
+            if job is not None:
+                job.cancel()
+            job = ComparisonJob(*rows, parse_types, use_cache=not skip_cache)
+            job.start()
+            st.session_state["compare_job"] = job
+
+        if job is None:
+            return
+        if job.running:
+            running_comparison(job)
+        else:
+            if job.status == "cancelled":
+                if st.button("Resume comparison", key="resume_compare_job"):
+                    job.start()
+                    st.rerun()
+            elif job.status == "failed":
+                st.error(f"Comparison failed: {job.error}")
+            render_comparison(job)
+
+
+@instrument.timed("latexall.render_comparison")
+def render_comparison(job: ComparisonJob):
+    progress = render_progress(job)
+
+    st.write("Expressions accepted by one parser and rejected by another:")
+    st.dataframe(job.matrix())
+    st.dataframe(
+        job.latency(),
+        hide_index=True,
+        column_config={"Seconds": st.column_config.NumberColumn(format="%.2f")},
+    )
+
+    results = job.snapshot()
+    if results:
+        st.write(
+            f"Parsers disagree on {len(results)}/{progress['rows_done']} IDs"
+            + (":" if job.status == "done" else " so far:")
+        )
+        table = pd.DataFrame(disagreement_rows(results))
+        if len(table) > MAX_COMPARE_ROWS:
+            st.caption(
+                f"Showing the first {MAX_COMPARE_ROWS:,} of {len(table):,} "
+                "expressions; download the IDs for the full list"
+            )
+        st.dataframe(table.head(MAX_COMPARE_ROWS), hide_index=True)
+        st.download_button(
+            "Download disagreeing IDs",
+            "\n".join(str(result["id"]) for result in results),
+            file_name="disagreeing_ids.txt",
+            key="download_disagreeing_ids",
+        )
+    elif job.status == "done":
+        st.success("All parsers agree on every expression!")
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def running_comparison(job: ComparisonJob):
+    """Refresh the comparison until it stops (see running_job)."""
+    instrument.bind(st.session_state.get("run_profile"))
+    if st.button("Cancel comparison", key="cancel_compare_job"):
+        job.cancel()
+    if not job.running:
+        st.rerun()
+    render_comparison(job)
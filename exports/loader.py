@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+import io
+import json
+import urllib.request
+
+import pandas as pd
+
+
+DEFAULT_CHUNK_ROWS = 10_000
+READ_BLOCK_SIZE = 1024 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class _CountingReader(io.RawIOBase):
+    """Wraps a binary stream and counts how many (compressed) bytes were read."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.bytes_read += n
+        return n
+
+
+def _source_size(source) -> int | None:
+    size = getattr(source, "size", None)
+    if isinstance(size, int):
+        return size
+    headers = getattr(source, "headers", None)
+    if headers is not None and headers.get("Content-Length"):
+        return int(headers["Content-Length"])
+    try:
+        position = source.tell()
+        source.seek(0, io.SEEK_END)
+        end = source.tell()
+        source.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def open_jsonl(raw, name: str | None = None):
+    """
+    Wrap a binary stream so that gzip/zstd payloads are decompressed on the fly.
+
+    The compression is picked from the file name suffix, falling back to the
+    magic bytes at the start of the stream.
+    """
+    buffered = io.BufferedReader(raw, buffer_size=READ_BLOCK_SIZE)
+    name = (name or "").lower()
+    magic = buffered.peek(4)[:4]
+
+    if name.endswith(".gz") or magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=buffered, mode="rb")
+    if name.endswith(".zst") or magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Reading .zst files requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(buffered)
+    return buffered
+
+
+def iter_jsonl_chunks(stream, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """
+    Yield lists of at most `chunk_rows` records parsed from a binary JSONL stream.
+    """
+    chunk = []
+    text = io.TextIOWrapper(stream, encoding="utf-8")
+    for line_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            chunk.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}") from e
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_jsonl(
+    source,
+    name: str | None = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    progress=None,
+) -> pd.DataFrame:
+    """
+    Stream a (possibly compressed) JSONL file into an object-dtype dataframe.
+
+    Records are parsed `chunk_rows` at a time and each chunk is turned into a
+    small frame right away, so the raw text and the parsed dicts of the whole
+    file are never held at the same time.
+
+    Args:
+        source: Path, URL, or binary file-like object
+        name: File name used to detect compression (defaults to the path/URL)
+        chunk_rows: Number of records parsed per chunk
+        progress: Optional callback `progress(fraction, rows)`; fraction is None
+            when the total size is unknown
+
+    Returns:
+        pd.DataFrame: One row per record, every column of dtype object
+    """
+    close = False
+    if isinstance(source, str):
+        name = name or source
+        if "://" in source:
+            source = urllib.request.urlopen(source)
+        else:
+            source = open(source, "rb")
+        close = True
+    name = name or getattr(source, "name", None)
+
+    try:
+        total = _source_size(source)
+        counter = _CountingReader(source)
+        stream = open_jsonl(counter, name)
+
+        frames = []
+        rows = 0
+        for records in iter_jsonl_chunks(stream, chunk_rows):
+            frames.append(pd.DataFrame(records, dtype=object))
+            rows += len(records)
+            del records
+            if progress is not None:
+                progress(
+                    min(counter.bytes_read / total, 1.0) if total else None, rows
+                )
+    finally:
+        if close:
+            source.close()
+
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True, copy=False)
+    return df.astype(object, copy=False)
+
+
+def content_digest(data) -> str:
+    """SHA-256 of an uploaded payload (bytes or a buffer)."""
+    return hashlib.sha256(data).hexdigest()
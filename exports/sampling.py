@@ -0,0 +1,207 @@
+import math
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from categories import category_groups
+from incremental import ValidationState
+from interfaces import SampleMode
+
+
+DEFAULT_SAMPLE_SIZE = 1_000
+DEFAULT_CONFIDENCE = 0.95
+# Rows validated per round while a time budget lasts
+SAMPLE_CHUNK_ROWS = 200
+OVERALL = "(all rows)"
+
+
+def sample_order(
+    n_rows: int, categories: list | None = None, seed: int = 0
+) -> np.ndarray:
+    """
+    A random order of row positions whose every prefix is a sample.
+
+    With `categories`, the order is stratified: each category's rows are
+    spread evenly through it, so any prefix holds every category in
+    proportion to its size (within one row).
+
+    Args:
+        n_rows: Number of rows
+        categories: Category of each row, or None for a simple random order
+        seed: Random seed; the same rows always give the same order
+    """
+    rng = np.random.default_rng(seed)
+    if categories is None:
+        return rng.permutation(n_rows)
+
+    keys = np.full(n_rows, np.nan)
+    strata = list(category_groups(pd.Series(categories, dtype=object)).values())
+    # category_groups leaves out missing categories; they form a stratum of their own
+    missing = np.flatnonzero(pd.isna(pd.Series(categories, dtype=object)).to_numpy())
+    if len(missing):
+        strata.append(missing)
+    for positions in strata:
+        shuffled = rng.permutation(positions)
+        size = len(shuffled)
+        keys[shuffled] = (np.arange(size) + rng.random(size)) / size
+    return np.argsort(keys, kind="stable")
+
+
+def wilson_interval(
+    successes: int, n: int, confidence: float = DEFAULT_CONFIDENCE
+) -> tuple[float, float]:
+    """Wilson score interval for a proportion; stays inside [0, 1] for tiny samples."""
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def estimate_rates(
+    outcomes: dict,
+    categories: list | None = None,
+    population: dict | None = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> pd.DataFrame:
+    """
+    Estimated rates with confidence intervals, overall and per category.
+
+    The overall interval treats the sample as a simple random one, which is
+    slightly conservative for a proportionally stratified sample.
+
+    Args:
+        outcomes: Metric name -> one bool per sampled row
+        categories: Category of each sampled row, or None for the overall row only
+        population: Category -> number of rows in the full data (see
+            categories.category_groups), shown next to the sample size
+        confidence: Confidence level of the intervals
+
+    Returns:
+        pd.DataFrame: Category, Sampled, Rows and, per metric, its estimate
+            and interval bounds in percent
+    """
+    flags = {name: np.asarray(values, dtype=bool) for name, values in outcomes.items()}
+    n = len(next(iter(flags.values()))) if flags else 0
+    groups = {OVERALL: np.arange(n)}
+    if categories is not None:
+        groups.update(category_groups(pd.Series(categories, dtype=object)))
+
+    rows = []
+    for category, positions in groups.items():
+        row = {"Category": str(category), "Sampled": len(positions)}
+        if population is not None:
+            row["Rows"] = (
+                sum(population.values())
+                if category == OVERALL
+                else population.get(category, 0)
+            )
+        for name, values in flags.items():
+            successes = int(values[positions].sum())
+            low, high = wilson_interval(successes, len(positions), confidence)
+            row[f"{name} %"] = (
+                100 * successes / len(positions) if len(positions) else math.nan
+            )
+            row[f"{name} low %"] = 100 * low
+            row[f"{name} high %"] = 100 * high
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def validate_sample(
+    state: ValidationState,
+    ids: list,
+    values: list,
+    order: np.ndarray,
+    size: int | None = None,
+    seconds: float | None = None,
+) -> tuple[np.ndarray, list[tuple]]:
+    """
+    Validate a prefix of `order`, stopping at `size` rows or after `seconds`.
+
+    Rows are synced into `state`, so validating more rows later (or all of
+    them) reuses the sampled results.
+
+    Returns:
+        tuple: (positions of the sampled rows, their validation results)
+    """
+    limit = len(order) if not size else min(size, len(order))
+    if not seconds:
+        positions = order[:limit]
+        return positions, state.sync(
+            [ids[p] for p in positions], [values[p] for p in positions]
+        )
+
+    deadline = time.perf_counter() + seconds
+    taken = 0
+    while True:
+        # Grow by a quarter so re-syncing the prefix stays cheap next to validating
+        taken = min(limit, taken + max(SAMPLE_CHUNK_ROWS, taken // 4))
+        positions = order[:taken]
+        results = state.sync(
+            [ids[p] for p in positions], [values[p] for p in positions]
+        )
+        if taken >= limit or time.perf_counter() >= deadline:
+            return positions, results
+
+
+def sample_controls(key_prefix: str) -> tuple[SampleMode, int, float]:
+    """
+    Side-by-side widgets for the rows to validate, the sample size and the time budget.
+
+    Widget keys start with `key_prefix`, e.g. "{key_prefix}_sample_mode".
+
+    Returns:
+        tuple: (sample mode, sample size, time budget in seconds; 0 for none)
+    """
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sample_mode = st.selectbox(
+            "Rows to validate",
+            list(SampleMode),
+            format_func=lambda mode: mode.value,
+            key=f"{key_prefix}_sample_mode",
+        )
+    with col2:
+        sample_size = st.number_input(
+            "Sample size",
+            min_value=1,
+            value=DEFAULT_SAMPLE_SIZE,
+            step=100,
+            key=f"{key_prefix}_sample_size",
+            disabled=sample_mode == SampleMode.ALL,
+        )
+    with col3:
+        sample_seconds = st.number_input(
+            "Time budget in seconds (0 for none)",
+            min_value=0.0,
+            value=0.0,
+            step=1.0,
+            key=f"{key_prefix}_sample_seconds",
+            disabled=sample_mode == SampleMode.ALL,
+        )
+    return sample_mode, sample_size, sample_seconds
+
+
+def render_estimate_table(
+    estimates: pd.DataFrame, description: str, confidence: float = DEFAULT_CONFIDENCE
+):
+    """Show `estimate_rates` output, captioned with `description` and the confidence."""
+    st.caption(
+        f"{description}; ranges are {confidence:.0%} Wilson confidence intervals"
+    )
+    st.dataframe(
+        estimates,
+        hide_index=True,
+        column_config={
+            column: st.column_config.NumberColumn(format="%.1f%%")
+            for column in estimates.columns
+            if column.endswith("%")
+        },
+    )
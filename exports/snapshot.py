@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+from categories import RECORD_COLUMN, has_path, resolve_path
+
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "streamlit-scripts", "snapshots"
+)
+SNAPSHOT_CHUNK_ROWS = 10_000
+# String columns with at most this share of distinct values are dictionary-encoded
+CATEGORICAL_RATIO = 0.5
+RECORDS_FILE = "records.arrow"
+
+
+def snapshot_dir() -> str:
+    return os.environ.get("DATASET_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+
+
+def snapshot_key(dataset_key: str) -> str:
+    """Store key of the snapshot of a dataset."""
+    return f"{dataset_key}#snapshot"
+
+
+def iter_records(df: pd.DataFrame):
+    """Yield the original nested records of a frame, snapshot or not."""
+    if RECORD_COLUMN in df.columns:
+        for text in df[RECORD_COLUMN]:
+            yield json.loads(text)
+    else:
+        yield from df.to_dict(orient="records")
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _snapshot_path(key: str) -> str:
+    return os.path.join(snapshot_dir(), _digest(key))
+
+
+def _column_files(directory: str, path: str) -> tuple[str, str]:
+    """The column file of a flattened path, and the marker of a path that cannot be."""
+    name = _digest(path)
+    return (
+        os.path.join(directory, f"{name}.arrow"),
+        os.path.join(directory, f"{name}.skip"),
+    )
+
+
+def _flat_column(values: list):
+    """A typed Arrow array for `values`, or None when they are nested or mixed."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    if pa.types.is_nested(array.type):
+        return None
+    if pa.types.is_string(array.type) and len(array):
+        if pc.count_distinct(array).as_py() <= len(array) * CATEGORICAL_RATIO:
+            return array.dictionary_encode()
+    return array
+
+
+def _record_column(df: pd.DataFrame):
+    import pyarrow as pa
+
+    chunks = []
+    for start in range(0, len(df), SNAPSHOT_CHUNK_ROWS):
+        text = df.iloc[start : start + SNAPSHOT_CHUNK_ROWS].to_json(
+            orient="records", lines=True
+        )
+        # JSON escapes newlines inside strings, so each line is one record
+        chunks.append(pa.array(text.rstrip("\n").split("\n"), pa.large_string()))
+    if not chunks:
+        return pa.array([], pa.large_string())
+    return pa.chunked_array(chunks)
+
+
+def _write_table(table, path: str):
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Sessions may write the same file at once; each uses its own temporary file
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp, "wb") as f:
+        with ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _read_table(path: str):
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    return ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def _to_pandas(table) -> pd.DataFrame:
+    """
+    Convert a (memory-mapped) table to a frame.
+
+    Columns stay Arrow-backed, so nothing is copied; dictionary-encoded
+    columns become pandas categoricals, which only copies their codes.
+    """
+    import pyarrow as pa
+
+    def types_mapper(arrow_type):
+        if pa.types.is_dictionary(arrow_type):
+            return None
+        return pd.ArrowDtype(arrow_type)
+
+    return table.to_pandas(types_mapper=types_mapper)
+
+
+def write_column(df: pd.DataFrame, path: str, directory: str) -> bool:
+    """
+    Flatten `path` of `df` into its own column file.
+
+    Paths that are missing or resolve to nested or mixed values are marked
+    instead, so they are not tried again; they are read from the records.
+
+    Returns:
+        bool: Whether a column was written
+    """
+    import pyarrow as pa
+
+    column_file, skip_file = _column_files(directory, path)
+    flat = None
+    if has_path(df, path):
+        flat = _flat_column(resolve_path(df, path).tolist())
+    if flat is None:
+        open(skip_file, "w").close()
+        return False
+    _write_table(pa.table({path: flat}), column_file)
+    return True
+
+
+def load_snapshot(key: str, paths: list, load=None) -> pd.DataFrame:
+    """
+    Memory-map the snapshot stored for `key`, building what is missing.
+
+    A snapshot is an uncompressed Arrow IPC file with each original record as
+    JSON text (RECORD_COLUMN), plus one file per flattened path with its
+    typed values (low-cardinality strings are dictionary-encoded). Paths
+    seen for the first time are flattened from the records and added, so
+    changing the configured keys never rewrites the records.
+
+    Args:
+        key: Content-based dataset key
+        paths: Nested paths to include as columns
+        load: Builds the nested object frame when no snapshot exists yet
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    import pyarrow as pa
+
+    directory = _snapshot_path(key)
+    records_file = os.path.join(directory, RECORDS_FILE)
+    source = None
+    if not os.path.exists(records_file):
+        source = load()
+        _write_table(pa.table({RECORD_COLUMN: _record_column(source)}), records_file)
+    records = _read_table(records_file)
+
+    columns = {}
+    for path in dict.fromkeys(paths):
+        if not path or path == RECORD_COLUMN:
+            continue
+        column_file, skip_file = _column_files(directory, path)
+        if not os.path.exists(column_file) and not os.path.exists(skip_file):
+            if source is None:
+                source = _to_pandas(records)
+            write_column(source, path, directory)
+        if os.path.exists(column_file):
+            columns[path] = _read_table(column_file).column(0)
+    columns[RECORD_COLUMN] = records.column(RECORD_COLUMN)
+    return _to_pandas(pa.table(columns))
+
+
+def extend_snapshot(df: pd.DataFrame, key: str, paths: list) -> pd.DataFrame | None:
+    """
+    The snapshot `df` with `paths` flattened as well, or None when nothing changes.
+
+    The rows are the same as in `df`, so a working set over `df` can be
+    rebased onto the result (see WorkingSet.rebase).
+    """
+    directory = _snapshot_path(key)
+    missing = [
+        path
+        for path in dict.fromkeys(paths)
+        if path
+        and path not in df.columns
+        and not os.path.exists(_column_files(directory, path)[1])
+    ]
+    if not missing:
+        return None
+    flattened = [column for column in df.columns if column != RECORD_COLUMN]
+    extended = load_snapshot(key, flattened + missing)
+    if list(extended.columns) == list(df.columns):
+        return None
+    return extended
@@ -0,0 +1,236 @@
+import itertools
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+
+DEFAULT_BUDGET_MB = 4096
+# Rows of each object column measured when estimating a frame's size
+SIZE_SAMPLE_ROWS = 1_000
+
+
+def default_budget_mb() -> int:
+    """Total size of resident datasets in MB (DATASET_STORE_MB); 0 means unlimited."""
+    return int(os.environ.get("DATASET_STORE_MB", DEFAULT_BUDGET_MB))
+
+
+def deep_sizeof(value, seen: set | None = None) -> int:
+    """Size of a value including everything it contains, counting shared objects once."""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            deep_sizeof(key, seen) + deep_sizeof(item, seen)
+            for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    return size
+
+
+def frame_nbytes(df: pd.DataFrame, sample_rows: int = SIZE_SAMPLE_ROWS) -> int:
+    """
+    Estimated memory of a frame.
+
+    Object columns hold nested dicts and lists, which pandas only measures
+    one level deep; their cells are measured recursively on an evenly spaced
+    sample of rows and scaled up to the whole column.
+    """
+    nbytes = int(df.memory_usage(index=True, deep=False)["Index"])
+    step = max(1, len(df) // sample_rows)
+    for column in df.columns:
+        values = df[column]
+        if values.dtype != object:
+            nbytes += int(values.memory_usage(index=False, deep=True))
+            continue
+        sample = values.iloc[::step].tolist()
+        if sample:
+            sampled = sum(deep_sizeof(value) for value in sample)
+            nbytes += int(sampled * len(values) / len(sample))
+        # The column's array of pointers
+        nbytes += values.memory_usage(index=False, deep=False)
+    return nbytes
+
+
+class DatasetLease:
+    """
+    A session's read-only handle on a shared dataset.
+
+    The store counts live leases to know which datasets are in use; dropping
+    the last reference to a lease (e.g. when its session ends) releases it.
+    Frames reached through a lease are shared, so they must never be
+    modified in place.
+    """
+
+    __slots__ = ("key", "df", "__weakref__")
+
+    def __init__(self, key: str, df: pd.DataFrame):
+        self.key = key
+        self.df = df
+
+
+class _Entry:
+    __slots__ = ("df", "nbytes", "source", "loaded_at", "last_used", "leases")
+
+    def __init__(self, df: pd.DataFrame, source: str | None):
+        self.df = df
+        self.nbytes = frame_nbytes(df)
+        self.source = source
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.leases = weakref.WeakSet()
+
+
+class DatasetStore:
+    """
+    Process-wide datasets keyed by content, shared by every session.
+
+    When the resident datasets exceed the memory budget, the least recently
+    used datasets that no session holds a lease on are evicted. Datasets in
+    use are never evicted, so the store can stay above budget until they are
+    released.
+    """
+
+    def __init__(self, budget_mb: int):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading = {}
+        self._anonymous = itertools.count()
+
+    def _lease(self, key: str, entry: _Entry) -> DatasetLease:
+        lease = DatasetLease(key, entry.df)
+        entry.leases.add(lease)
+        entry.last_used = time.time()
+        self._entries.move_to_end(key)
+        return lease
+
+    def load(self, key: str | None, load, source: str | None = None):
+        """
+        Lease the dataset stored under `key`, calling `load()` to build it on a miss.
+
+        Concurrent loads of the same key wait for the first one instead of
+        reading the file again. Datasets without a key (the source cannot be
+        identified) are still tracked against the budget but never shared.
+
+        Returns:
+            tuple: (DatasetLease, seconds spent, whether it was already resident)
+        """
+        start = time.perf_counter()
+        if key is None:
+            df = load()
+            return self.put(df, source), time.perf_counter() - start, False
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._lease(key, entry), time.perf_counter() - start, True
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = threading.Lock()
+        with loading:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return self._lease(key, entry), time.perf_counter() - start, True
+            try:
+                df = load()
+                return self.put(df, source, key), time.perf_counter() - start, False
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def put(
+        self, df: pd.DataFrame, source: str | None = None, key: str | None = None
+    ) -> DatasetLease:
+        """Store a frame that is already in memory and lease it."""
+        with self._lock:
+            if key is None:
+                key = f"anonymous-{next(self._anonymous)}"
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(df, source)
+            lease = self._lease(key, entry)
+            self._evict()
+            return lease
+
+    def replace(self, key: str, df: pd.DataFrame) -> DatasetLease:
+        """
+        Store an equivalent frame (e.g. with more columns) under `key` and lease it.
+
+        Sessions leasing the previous frame keep it until they move on.
+        """
+        with self._lock:
+            previous = self._entries.get(key)
+            entry = self._entries[key] = _Entry(
+                df, previous.source if previous is not None else None
+            )
+            if previous is not None:
+                entry.loaded_at = previous.loaded_at
+            lease = self._lease(key, entry)
+            self._evict()
+            return lease
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def _evict(self):
+        if self.budget_bytes <= 0:
+            return
+        total = sum(entry.nbytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.budget_bytes:
+                break
+            entry = self._entries[key]
+            if not entry.leases:
+                total -= entry.nbytes
+                del self._entries[key]
+
+    def evict_unused(self) -> int:
+        """Drop every dataset no session is using. Returns how many were dropped."""
+        with self._lock:
+            unused = [key for key, entry in self._entries.items() if not entry.leases]
+            for key in unused:
+                del self._entries[key]
+            return len(unused)
+
+    def stats(self) -> list[dict]:
+        """Resident datasets, least recently used first."""
+        with self._lock:
+            return [
+                {
+                    "key": key,
+                    "source": entry.source,
+                    "rows": len(entry.df),
+                    "columns": len(entry.df.columns),
+                    "mb": entry.nbytes / 1024 / 1024,
+                    "sessions": len(entry.leases),
+                    "loaded_at": entry.loaded_at,
+                    "last_used": entry.last_used,
+                }
+                for key, entry in self._entries.items()
+            ]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_dataset_store() -> DatasetStore:
+    """Process-wide store shared by every session (budget from DATASET_STORE_MB)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore(default_budget_mb())
+        return _store
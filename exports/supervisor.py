@@ -0,0 +1,321 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; memory caps are skipped there
+    resource = None
+
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MEMORY_MB = 2048
+# Sympy keeps internal caches, so long-lived workers are recycled periodically
+MAX_EXPRESSIONS_PER_WORKER = 50_000
+STARTUP_TIMEOUT = 120.0
+
+TIMEOUT_ERROR = "timeout"
+RESOURCE_ERROR = "resource"
+
+
+def default_timeout() -> float:
+    """Per-expression wall-clock limit in seconds; 0 disables supervision."""
+    return float(os.environ.get("VALIDATION_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def default_memory_mb() -> int:
+    """Per-worker address-space limit in MB; 0 disables the cap."""
+    return int(os.environ.get("VALIDATION_MEMORY_MB", DEFAULT_MEMORY_MB))
+
+
+def error_class(error: str) -> str:
+    """Classify a validation error message: "", "timeout", "resource" or "parse"."""
+    if not error:
+        return ""
+    if error.startswith(f"{TIMEOUT_ERROR}:"):
+        return TIMEOUT_ERROR
+    if error.startswith(f"{RESOURCE_ERROR}:"):
+        return RESOURCE_ERROR
+    return "parse"
+
+
+def is_supervision_error(result: tuple) -> bool:
+    return error_class(result[2]) in (TIMEOUT_ERROR, RESOURCE_ERROR)
+
+
+def _worker_main(conn, memory_mb: int):
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    from utils import load_parsers, validate_text_uncached
+
+    conn.send("ready")
+    loaded = set()
+    while True:
+        message = conn.recv()
+        if message is None:
+            return
+        texts, parse_type = message
+        if parse_type not in loaded:
+            # Only the parsers this parse type needs, before the parent's clock starts
+            load_parsers(parse_type)
+            loaded.add(parse_type)
+            conn.send("ready")
+        for text in texts:
+            try:
+                result = validate_text_uncached(text, parse_type)
+            except MemoryError:
+                result = (
+                    False,
+                    False,
+                    f"{RESOURCE_ERROR}: memory limit of {memory_mb} MB exceeded",
+                )
+            conn.send(result)
+
+
+class _Worker:
+    """One supervised validation process, restarted after a timeout or crash."""
+
+    def __init__(self, context, memory_mb: int):
+        self.context = context
+        self.memory_mb = memory_mb
+        self._start()
+
+    def _start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main, args=(child_conn, self.memory_mb), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.loaded = set()
+        self.handled = 0
+
+    def restart(self):
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+        self._start()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+    def _await_ready(self, failure: str):
+        try:
+            ready = self.conn.poll(STARTUP_TIMEOUT) and self.conn.recv() == "ready"
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            raise RuntimeError(failure)
+
+    def _wait_ready(self):
+        if not self.ready:
+            self._await_ready("Validation worker failed to start")
+            self.ready = True
+
+    def load(self, parse_type):
+        """Load the parsers for `parse_type` ahead of the first chunk that needs them."""
+        if parse_type in self.loaded:
+            return
+        try:
+            self._wait_ready()
+            self.conn.send(([], parse_type))
+            self._await_ready(f"Validation worker failed to load {parse_type}")
+        except (BrokenPipeError, OSError, RuntimeError):
+            # A late "ready" would be mistaken for a result, so start clean
+            self.restart()
+            raise
+        self.loaded.add(parse_type)
+
+    def run(
+        self, texts: list, parse_type, timeout: float, seconds: list | None = None
+    ) -> list[tuple]:
+        """
+        Validate `texts` in order, giving each at most `timeout` seconds.
+
+        The time taken by each expression is appended to `seconds`, if given.
+        """
+        if self.handled >= MAX_EXPRESSIONS_PER_WORKER:
+            self.restart()
+
+        results = []
+        while len(results) < len(texts):
+            self._wait_ready()
+            remaining = texts[len(results) :]
+            try:
+                self.conn.send((remaining, parse_type))
+            except (BrokenPipeError, OSError):
+                # Died while idle (e.g. killed by the OS); start over with a fresh worker
+                self.restart()
+                continue
+            if parse_type not in self.loaded:
+                self._await_ready(f"Validation worker failed to load {parse_type}")
+                self.loaded.add(parse_type)
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    if self.conn.poll(timeout):
+                        results.append(self.conn.recv())
+                        self.handled += 1
+                        # Includes the pipe round trip, which is small next to a parse
+                        elapsed = time.perf_counter() - started
+                        if seconds is not None:
+                            seconds.append(elapsed)
+                        if instrument.enabled():
+                            instrument.record_parse(parse_type, elapsed)
+                        continue
+                    failure = (
+                        f"{TIMEOUT_ERROR}: validation took longer than {timeout:g}s"
+                    )
+                except (EOFError, OSError):
+                    failure = f"{RESOURCE_ERROR}: validation worker was killed"
+                # The worker is stuck or gone: record the failure, restart and resend the rest
+                results.append((False, False, failure))
+                self.restart()
+                break
+        return results
+
+
+class SupervisedPool:
+    """
+    Up to `workers` validation processes with a per-expression timeout and memory cap.
+
+    Workers are started when a chunk finds none idle, so small batches only
+    start one. Chunks are handed to idle workers from parent threads; a
+    worker that exceeds the timeout or dies is killed and replaced, and the
+    expressions after the failing one are resent.
+    """
+
+    def __init__(self, workers: int, timeout: float, memory_mb: int, mp_context):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.mp_context = mp_context
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        # Parse type -> seconds the warm-up worker took to load it, or its state
+        self.load_seconds = {}
+
+    def _acquire(self) -> _Worker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.workers:
+                worker = _Worker(self.mp_context, self.memory_mb)
+                self._workers.append(worker)
+                return worker
+        return self._idle.get()
+
+    def _run(self, chunk, parse_type, seconds):
+        worker = self._acquire()
+        try:
+            return worker.run(chunk, parse_type, self.timeout, seconds)
+        finally:
+            self._idle.put(worker)
+
+    def map_chunks(
+        self, chunks: list, parse_type, seconds: list | None = None
+    ) -> list[list[tuple]]:
+        """
+        Validate each chunk, returning the per-chunk results in order.
+
+        The time taken by each expression is appended to `seconds`, if given.
+        """
+        if len(chunks) <= 1:
+            return [self._run(chunk, parse_type, seconds) for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+            return list(
+                executor.map(
+                    lambda chunk: self._run(chunk, parse_type, seconds), chunks
+                )
+            )
+
+    def warm_up(self, parse_types) -> threading.Thread | None:
+        """
+        Start a worker, if none is running, and load `parse_types` in it on a background thread.
+
+        Parse types already loaded or loading are skipped; returns None when
+        there is nothing left to load.
+        """
+        with self._lock:
+            missing = [p for p in parse_types if p not in self.load_seconds]
+            for parse_type in missing:
+                self.load_seconds[parse_type] = "loading"
+        if not missing:
+            return None
+        thread = threading.Thread(target=self._load, args=(missing,), daemon=True)
+        thread.start()
+        return thread
+
+    def _load(self, parse_types):
+        try:
+            worker = self._acquire()
+        except (OSError, RuntimeError):
+            for parse_type in parse_types:
+                self.load_seconds[parse_type] = "failed"
+            return
+        try:
+            for parse_type in parse_types:
+                if parse_type in worker.loaded:
+                    # A batch got there first and loaded it as part of its work
+                    self.load_seconds[parse_type] = "loaded by a batch"
+                    continue
+                started = time.perf_counter()
+                try:
+                    worker.load(parse_type)
+                except (BrokenPipeError, OSError, RuntimeError):
+                    self.load_seconds[parse_type] = "failed"
+                else:
+                    self.load_seconds[parse_type] = time.perf_counter() - started
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_supervised_pool(
+    workers: int, timeout: float, memory_mb: int, mp_context
+) -> SupervisedPool:
+    """Shared pool, recreated when its configuration changes."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or (_pool.workers, _pool.timeout, _pool.memory_mb) != (
+            workers,
+            timeout,
+            memory_mb,
+        ):
+            if _pool is not None:
+                _pool.close()
+            _pool = SupervisedPool(workers, timeout, memory_mb, mp_context)
+        return _pool
+
+
+def shutdown_supervised_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,119 @@
+import argparse
+import json
+import random
+import string
+
+
+CATEGORIES = ["algebra", "geometry", "number theory", "calculus", "probability"]
+# Accepted by every parser
+VALID_EXPRESSIONS = [
+    "\\frac{%(a)d}{%(b)d}",
+    "x^{%(a)d} + %(b)dx",
+    "\\sqrt{%(a)d} \\cdot %(b)d",
+    "\\sum_{k=1}^{%(a)d} k^{%(b)d}",
+    "\\int_0^{%(a)d} t^{%(b)d}\\,dt",
+    "(%(a)d + %(b)d)^2",
+    "%(a)d.%(b)d",
+]
+# Each is a valid template with one typical mistake, rejected by every parser
+# and cascade tier except the lenient pylatexenc
+BROKEN_EXPRESSIONS = [
+    "\\frac{%(a)d}{%(b)d",
+    "x^{%(a)d + %(b)dx",
+    "\\left( %(a)d + %(b)d",
+    "\\sqrt{%(a)d",
+    "x^{%(a)d}}",
+]
+WORDS = "let note that the value of so we get hence step then since".split()
+
+
+class SyntheticExport:
+    """
+    Deterministic generator of export-like JSONL records.
+
+    Args:
+        rows: Number of records
+        depth: Nesting depth of the `context` field
+        math_density: Math expressions per text field
+        error_rate: Fraction of expressions that are invalid LaTeX
+        seed: Random seed; the same arguments always give the same records
+    """
+
+    def __init__(
+        self,
+        rows: int = 1_000,
+        depth: int = 2,
+        math_density: int = 3,
+        error_rate: float = 0.1,
+        seed: int = 0,
+    ):
+        self.rows = rows
+        self.depth = depth
+        self.math_density = math_density
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def expression(self, rng: random.Random) -> str:
+        templates = (
+            BROKEN_EXPRESSIONS if rng.random() < self.error_rate else VALID_EXPRESSIONS
+        )
+        return rng.choice(templates) % {
+            "a": rng.randint(1, 99),
+            "b": rng.randint(1, 99),
+        }
+
+    def text(self, rng: random.Random) -> str:
+        parts = []
+        for i in range(self.math_density):
+            parts.append(" ".join(rng.choices(WORDS, k=rng.randint(3, 8))))
+            if i % 2:
+                parts.append(f"$${self.expression(rng)}$$")
+            else:
+                parts.append(f"${self.expression(rng)}$")
+        parts.append(" ".join(rng.choices(WORDS, k=5)) + ".")
+        return " ".join(parts)
+
+    def context(self, rng: random.Random, depth: int):
+        if depth <= 0:
+            return self.text(rng)
+        return {
+            "text": self.text(rng),
+            "hints": [self.text(rng) for _ in range(2)],
+            "child": self.context(rng, depth - 1),
+        }
+
+    def records(self):
+        rng = random.Random(self.seed)
+        for _ in range(self.rows):
+            yield {
+                "idx": "".join(
+                    rng.choices(string.ascii_lowercase + string.digits, k=16)
+                ),
+                "verification": self.expression(rng),
+                "metadata": {
+                    "sub_category": rng.choice(CATEGORIES),
+                    "difficulty": rng.randint(1, 5),
+                },
+                "solution": self.text(rng),
+                "context": self.context(rng, self.depth),
+            }
+
+    def write(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.records():
+                f.write(json.dumps(record) + "\n")
+        return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic export JSONL file.")
+    parser.add_argument("output")
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--math-density", type=int, default=3)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    SyntheticExport(
+        args.rows, args.depth, args.math_density, args.error_rate, args.seed
+    ).write(args.output)
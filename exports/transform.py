@@ -0,0 +1,85 @@
+from functools import lru_cache
+
+import jsonata
+
+from engine import default_workers, map_in_pool
+from writers import SchemaTracker
+
+
+TRANSFORM_CHUNK_ROWS = 1_000
+# Below this many records the pool round-trip costs more than it saves
+MIN_PARALLEL_RECORDS = 5_000
+
+
+@lru_cache(maxsize=16)
+def _compile(expression: str):
+    return jsonata.Jsonata(expression)
+
+
+def _transform_chunk(expression: str, records: list, offset: int):
+    """Evaluate `expression` on each record, collecting per-row errors and columns."""
+    compiled = _compile(expression)
+    schema = SchemaTracker()
+    results = []
+    errors = []
+    for i, record in enumerate(records):
+        try:
+            result = compiled.evaluate(record)
+        except Exception as e:
+            results.append(None)
+            errors.append((offset + i, str(e)))
+            continue
+        results.append(result)
+        schema.observe(result)
+    return results, errors, schema.columns
+
+
+def transform_records(
+    records: list,
+    expression: str,
+    workers: int | None = None,
+    chunk_rows: int = TRANSFORM_CHUNK_ROWS,
+):
+    """
+    Apply a JSONata expression to every record.
+
+    Records are sent to the evaluator in chunks, fanned out over the shared
+    process pool for large inputs. A record that fails to evaluate yields None
+    and an error entry instead of aborting the whole transform.
+
+    Args:
+        records: Row dicts to transform
+        expression: JSONata expression applied to each record
+        workers: Number of worker processes (defaults to VALIDATION_WORKERS or CPU count)
+        chunk_rows: Records per chunk
+
+    Returns:
+        tuple: (results aligned with `records`, list of (row position, error
+            message), output columns in first-seen order)
+
+    Raises:
+        Exception: If the expression itself does not compile
+    """
+    # Compile up front so that syntax errors surface once, not once per row
+    _compile(expression)
+
+    workers = workers or default_workers()
+    offsets = range(0, len(records), chunk_rows)
+    chunks = [records[offset : offset + chunk_rows] for offset in offsets]
+
+    if workers <= 1 or len(records) < MIN_PARALLEL_RECORDS:
+        outputs = map(_transform_chunk, [expression] * len(chunks), chunks, offsets)
+    else:
+        outputs = map_in_pool(
+            workers, _transform_chunk, [expression] * len(chunks), chunks, offsets
+        )
+
+    # Chunks come back in order, so merging their columns keeps the order stable
+    schema = SchemaTracker()
+    results = []
+    errors = []
+    for chunk_results, chunk_errors, chunk_columns in outputs:
+        results.extend(chunk_results)
+        errors.extend(chunk_errors)
+        schema.merge(chunk_columns)
+    return results, errors, schema.columns
@@ -1,17 +1,126 @@
 import re
-from sympy import sympify
-from sympy.parsing.latex import parse_latex, parse_latex_lark
-from pylatexenc.latex2text import LatexNodes2Text
-from interfaces import ParseType
+import threading
+import time
+from interfaces import ParseType, MathDelimiter, CascadeTier
+from cache import get_validation_cache
+import instrument
+
+
+# Parsers each parse type needs; they are imported on first use, not at import time
+PARSERS_FOR = {
+    ParseType.PYLATEXENC: (ParseType.PYLATEXENC,),
+    ParseType.SYMPY_LARK: (ParseType.SYMPY_LARK,),
+    ParseType.SYMPY_ANTLR: (ParseType.SYMPY_ANTLR,),
+    ParseType.CASCADE: (ParseType.PYLATEXENC, ParseType.SYMPY_ANTLR),
+    ParseType.CASCADE_PYLATEXENC: (ParseType.PYLATEXENC,),
+    ParseType.CASCADE_STRUCTURE: (),
+}
+# Seconds each parser took to import and build its grammar, once loaded
+PARSER_LOAD_SECONDS = {}
+
+_parsers = {}
+_parser_locks = {parser: threading.Lock() for parser in PARSERS_FOR[ParseType.CASCADE]}
+_parser_locks[ParseType.SYMPY_LARK] = threading.Lock()
+_warm_ups = {}
+_warm_ups_lock = threading.Lock()
+
+
+def _import_parser(parser: ParseType):
+    if parser == ParseType.PYLATEXENC:
+        from pylatexenc.latex2text import LatexNodes2Text
+
+        return LatexNodes2Text
+    if parser == ParseType.SYMPY_LARK:
+        # Importing sympy.parsing.latex builds the Lark grammar
+        from sympy.parsing.latex import parse_latex_lark
+
+        return parse_latex_lark
+    if parser == ParseType.SYMPY_ANTLR:
+        from sympy import sympify
+        from sympy.parsing.latex import parse_latex
+
+        # The ANTLR runtime and generated parser are loaded on the first parse
+        parse_latex("x")
+        return parse_latex, sympify
+    raise ValueError(f"Invalid parser: {parser}")
+
+
+def get_parser(parser: ParseType):
+    """The entry point of one parser, importing it on first use."""
+    loaded = _parsers.get(parser)
+    if loaded is None:
+        with _parser_locks[parser]:
+            if parser not in _parsers:
+                started = time.perf_counter()
+                _parsers[parser] = _import_parser(parser)
+                PARSER_LOAD_SECONDS[parser] = time.perf_counter() - started
+            loaded = _parsers[parser]
+    return loaded
+
+
+def load_parsers(parse_type: ParseType | None = None):
+    """Load the parsers `parse_type` needs, or every parser when omitted."""
+    parsers = (
+        PARSERS_FOR[ParseType(parse_type)]
+        if parse_type is not None
+        else (ParseType.PYLATEXENC, ParseType.SYMPY_LARK, ParseType.SYMPY_ANTLR)
+    )
+    for parser in parsers:
+        get_parser(parser)
+
+
+def warm_up(parse_type: ParseType) -> threading.Thread:
+    """Load the parsers for `parse_type` on a background thread, once."""
+    parse_type = ParseType(parse_type)
+    with _warm_ups_lock:
+        thread = _warm_ups.get(parse_type)
+        if thread is None:
+            thread = threading.Thread(
+                target=load_parsers, args=(parse_type,), daemon=True
+            )
+            thread.start()
+            _warm_ups[parse_type] = thread
+    return thread
+
+
+def parser_status() -> dict:
+    """Parser -> load time in seconds, "loading" or None when not loaded yet."""
+    status = {}
+    for parser in (ParseType.PYLATEXENC, ParseType.SYMPY_LARK, ParseType.SYMPY_ANTLR):
+        if parser in PARSER_LOAD_SECONDS:
+            status[parser] = PARSER_LOAD_SECONDS[parser]
+        elif _parser_locks[parser].locked():
+            status[parser] = "loading"
+        else:
+            status[parser] = None
+    return status
+
+
+def strip_inline_delimiters(text: str) -> str:
+    # Define inline LaTeX delimiters patterns
+    INLINE_DELIMITERS = [(r"^\$", r"\$$"), (r"^\\\(", r"\\\)$")]
+
+    # Remove inline latex delimiters if present
+    text = text.strip()
+    for start_pattern, end_pattern in INLINE_DELIMITERS:
+        if re.match(start_pattern, text) and re.search(end_pattern, text):
+            text = re.sub(start_pattern, "", text)
+            text = re.sub(end_pattern, "", text)
+            break
+    return text
 
 
 def validate_text_pylatexenc(text):
     if not text:
         return False, False, "No text to validate"
 
+    LatexNodes2Text = get_parser(ParseType.PYLATEXENC)
     try:
         LatexNodes2Text().latex_to_text(text)
         return True, False, ""
+    except MemoryError:
+        # Let the supervising worker report this as a resource error
+        raise
     except Exception as e:
         return False, False, str(e)
 
@@ -20,20 +129,16 @@ def validate_text_lark(text):
     if not text:
         return False, False, "No text to validate"
 
+    parse_latex_lark = get_parser(ParseType.SYMPY_LARK)
     try:
-        # Define inline LaTeX delimiters patterns
-        INLINE_DELIMITERS = [(r"^\$", r"\$$"), (r"^\\\(", r"\\\)$")]
-
         # Remove inline latex delimiters if present
-        text = text.strip()
-        for start_pattern, end_pattern in INLINE_DELIMITERS:
-            if re.match(start_pattern, text) and re.search(end_pattern, text):
-                text = re.sub(start_pattern, "", text)
-                text = re.sub(end_pattern, "", text)
-                break
+        text = strip_inline_delimiters(text)
 
         parse_latex_lark(text)
         return True, False, ""
+    except MemoryError:
+        # Let the supervising worker report this as a resource error
+        raise
     except Exception as e:
         return False, False, str(e)
 
@@ -42,68 +147,236 @@ def validate_text_antlr(text):
     if not text:
         return False, False, "No text to validate"
 
+    parse_latex, sympify = get_parser(ParseType.SYMPY_ANTLR)
     try:
-        # Define inline LaTeX delimiters patterns
-        INLINE_DELIMITERS = [(r"^\$", r"\$$"), (r"^\\\(", r"\\\)$")]
-
         # Remove inline latex delimiters if present
-        text = text.strip()
-        for start_pattern, end_pattern in INLINE_DELIMITERS:
-            if re.match(start_pattern, text) and re.search(end_pattern, text):
-                text = re.sub(start_pattern, "", text)
-                text = re.sub(end_pattern, "", text)
-                break
+        text = strip_inline_delimiters(text)
 
         parsed = parse_latex(text, strict=True)
         value = sympify(parsed)
         return True, value.is_number, ""
+    except MemoryError:
+        # Let the supervising worker report this as a resource error
+        raise
     except Exception as e:
         return False, False, str(e)
 
 
-def validate_text(text, parse_type: ParseType = ParseType.SYMPY_ANTLR):
+# Plain decimal numbers are valid LaTeX and numeric for every parser
+NUMBER_REGEX = re.compile(r"-?\d+(?:\.\d+)?")
+COMMAND_REGEX = re.compile(r"\\([a-zA-Z]+|.)")
+BRACE_REGEX = re.compile(r"(?<!\\)[{}]")
+
+# Commands that pylatexenc always renders, so it cannot reject expressions made of them
+SAFE_COMMANDS = frozenset(
+    """
+    frac dfrac tfrac binom sqrt cdot times div pm mp circ
+    sin cos tan csc sec cot arcsin arccos arctan sinh cosh tanh log ln lg exp
+    lim sum prod int oint infty partial nabla to
+    leq geq neq le ge ne lt gt approx equiv sim propto
+    left right langle rangle lfloor rfloor lceil rceil mid vert
+    cdots ldots dots vdots ddots
+    alpha beta gamma delta epsilon varepsilon zeta eta theta vartheta iota kappa
+    lambda mu nu xi pi varpi rho sigma tau upsilon phi varphi chi psi omega
+    Gamma Delta Theta Lambda Xi Pi Sigma Upsilon Phi Psi Omega
+    mathrm mathbf mathit text operatorname overline bar hat vec dot prime
+    quad qquad , ; ! { } \\ % $ _ &
+    """.split()
+)
+
+CASCADE_STOP_AFTER = {
+    ParseType.CASCADE: CascadeTier.SYMPY,
+    ParseType.CASCADE_PYLATEXENC: CascadeTier.PYLATEXENC,
+    ParseType.CASCADE_STRUCTURE: CascadeTier.STRUCTURE,
+}
+
+
+def check_structure(text: str):
+    """
+    Fast structural checks that need no parser.
+
+    Returns:
+        tuple: (decision, is_number, error, needs_pylatexenc) where decision is
+            True/False when the structure alone decides, or None otherwise
+    """
+    if NUMBER_REGEX.fullmatch(text):
+        return True, True, "", False
+
+    depth = 0
+    for brace in BRACE_REGEX.findall(text):
+        depth += 1 if brace == "{" else -1
+        if depth < 0:
+            return False, False, "Unbalanced braces: unexpected '}'", False
+    if depth:
+        return False, False, "Unbalanced braces: missing '}'", False
+
+    commands = COMMAND_REGEX.findall(text)
+    if commands.count("left") != commands.count("right"):
+        return False, False, "Unbalanced \\left/\\right", False
+
+    needs_pylatexenc = any(command not in SAFE_COMMANDS for command in commands)
+    return None, False, "", needs_pylatexenc
+
+
+def validate_text_cascade(text, stop_after: CascadeTier = CascadeTier.SYMPY):
+    """
+    Validate with increasingly expensive tiers, stopping at the first that decides.
+
+    The structure tier rejects unbalanced braces or \\left/\\right and accepts
+    plain numbers. pylatexenc runs only when the expression uses a command
+    outside SAFE_COMMANDS. sympy (ANTLR) decides everything else, unless
+    `stop_after` ends the cascade earlier, in which case the expression is
+    accepted as far as the cheaper tiers can tell.
+
+    Returns:
+        tuple: (is_valid, is_number, error, CascadeTier that decided)
+    """
+    if not text:
+        return False, False, "No text to validate", CascadeTier.STRUCTURE
+
+    try:
+        stripped = strip_inline_delimiters(text)
+    except AttributeError as e:
+        return False, False, str(e), CascadeTier.STRUCTURE
+
+    decision, is_number, error, needs_pylatexenc = check_structure(stripped)
+    if decision is not None or stop_after == CascadeTier.STRUCTURE:
+        return bool(decision is None or decision), is_number, error, CascadeTier.STRUCTURE
+
+    if needs_pylatexenc:
+        is_valid, _, error = validate_text_pylatexenc(text)
+        if not is_valid or stop_after == CascadeTier.PYLATEXENC:
+            return is_valid, False, error, CascadeTier.PYLATEXENC
+    elif stop_after == CascadeTier.PYLATEXENC:
+        return True, False, "", CascadeTier.STRUCTURE
+
+    return (*validate_text_antlr(text), CascadeTier.SYMPY)
+
+
+def validate_text_uncached(text, parse_type: ParseType = ParseType.SYMPY_ANTLR):
+    if not instrument.enabled():
+        return _validate_text_uncached(text, parse_type)
+    started = time.perf_counter()
+    result = _validate_text_uncached(text, parse_type)
+    instrument.record_parse(parse_type, time.perf_counter() - started)
+    return result
+
+
+def _validate_text_uncached(text, parse_type: ParseType):
     if parse_type == ParseType.PYLATEXENC:
         return validate_text_pylatexenc(text)
     elif parse_type == ParseType.SYMPY_LARK:
         return validate_text_lark(text)
     elif parse_type == ParseType.SYMPY_ANTLR:
         return validate_text_antlr(text)
+    elif parse_type in CASCADE_STOP_AFTER:
+        return validate_text_cascade(text, CASCADE_STOP_AFTER[parse_type])
 
     else:
         raise ValueError(f"Invalid parse type: {parse_type}")
 
 
-def extract_math_expressions(text: str, inline_only: bool = False) -> list[str]:
-    # Regular expressions for detecting LaTeX math delimiters
-    INLINE_MATH_REGEX = r"(?<!\\)(?:\$(?!\$)[\s\S]*?(?<!\\)\$(?!\$)|\\\([\s\S]*?\\\))"
-    BLOCK_MATH_REGEX = r"(?<!\\)(?:\$\$[\s\S]*?(?<!\\)\$\$|\\\[[\s\S]*?\\\])"
+@instrument.timed("utils.validate_text")
+def validate_text(
+    text, parse_type: ParseType = ParseType.SYMPY_ANTLR, use_cache: bool = True
+):
+    """
+    Validate a LaTeX expression with the given parser.
 
-    # Patterns for the delimiters to remove
-    BLOCK_DELIMITERS = [(r"^\$\$", r"\$\$$"), (r"^\\\[", r"\\\]$")]
-    INLINE_DELIMITERS = [(r"^\$", r"\$$"), (r"^\\\(", r"\\\)$")]
+    Returns:
+        tuple: (is_valid, is_number, error); cascade parse types append the
+            CascadeTier that decided the result
+    """
+    # Only real expressions are worth caching; empty/non-string input is cheap
+    if not use_cache or not isinstance(text, str) or not text:
+        return validate_text_uncached(text, parse_type)
+
+    cache = get_validation_cache()
+    result = cache.get(text, parse_type)
+    if result is None:
+        result = validate_text_uncached(text, parse_type)
+        cache.put(text, parse_type, result)
+    return result
+
+
+BLOCK_DELIMITERS = frozenset((MathDelimiter.DOUBLE_DOLLAR, MathDelimiter.BRACKET))
+INLINE_DELIMITERS = frozenset((MathDelimiter.DOLLAR, MathDelimiter.PAREN))
 
-    # Find all math expressions
-    all_math = re.findall(f"{BLOCK_MATH_REGEX}|{INLINE_MATH_REGEX}", text)
-
-    # Remove delimiters from each expression
-    cleaned_expressions = []
-    for expr in all_math:
-        # Try block delimiters first
-        if not inline_only:
-            for start, end in BLOCK_DELIMITERS:
-                if re.search(start, expr) and re.search(end, expr):
-                    cleaned = re.sub(f"{start}|{end}", "", expr)
-                    cleaned_expressions.append(cleaned)
-                    break
+
+def iter_math_expressions(text: str):
+    """
+    Scan text once for block ($$...$$, \\[...\\]) and inline ($...$, \\(...\\)) math.
+
+    Delimiters are found with str.find, which runs in C, instead of stepping
+    a regex through every character; the next candidate of each opener kind
+    is remembered until the scan passes it. Escaped dollars (\\$) never open
+    or close an expression, and an opener without a closer is plain text.
+
+    Yields:
+        tuple: (expression without delimiters, MathDelimiter, offset of the opening delimiter)
+    """
+    find = text.find
+    startswith = text.startswith
+    absent = len(text)
+    position = 0
+    dollar = bracket = paren = -1
+    while True:
+        if dollar < position:
+            dollar = find("$", position)
+            if dollar < 0:
+                dollar = absent
+        if bracket < position:
+            bracket = find("\\[", position)
+            if bracket < 0:
+                bracket = absent
+        if paren < position:
+            paren = find("\\(", position)
+            if paren < 0:
+                paren = absent
+        start = dollar if dollar < bracket and dollar < paren else min(bracket, paren)
+        if start == absent:
+            return
+        if start and text[start - 1] == "\\":
+            position = start + 1
+            continue
+
+        if start == dollar:
+            if startswith("$", start + 1):
+                delimiter, content = MathDelimiter.DOUBLE_DOLLAR, start + 2
+                end = find("$$", content)
+                while end > 0 and text[end - 1] == "\\":
+                    end = find("$$", end + 1)
+                after = end + 2
+            else:
+                delimiter, content = MathDelimiter.DOLLAR, start + 1
+                end = find("$", content)
+                # A single dollar closes only if it is not escaped or doubled
+                while end > 0 and (text[end - 1] == "\\" or startswith("$", end + 1)):
+                    end = find("$", end + 1)
+                after = end + 1
         else:
-            # If not block math, try inline delimiters
-            for start, end in INLINE_DELIMITERS:
-                if re.search(start, expr) and re.search(end, expr):
-                    cleaned = re.sub(f"{start}|{end}", "", expr)
-                    cleaned_expressions.append(cleaned)
-                    break
+            content = start + 2
+            if start == bracket:
+                delimiter, end = MathDelimiter.BRACKET, find("\\]", content)
+            else:
+                delimiter, end = MathDelimiter.PAREN, find("\\)", content)
+            after = end + 2
+        if end < 0:
+            # Unclosed: the opener is plain text, keep scanning right after it
+            position = start + 1
+            continue
+        yield text[content:end], delimiter, start
+        position = after
+
 
-    return cleaned_expressions
+def extract_math_expressions(text: str, inline_only: bool = False) -> list[str]:
+    """Block math expressions in `text`, or only the inline ones with `inline_only`."""
+    wanted = INLINE_DELIMITERS if inline_only else BLOCK_DELIMITERS
+    return [
+        expression
+        for expression, delimiter, _ in iter_math_expressions(text)
+        if delimiter in wanted
+    ]
 
 
 def extract_all_text(data) -> str:
@@ -142,3 +415,64 @@ def extract_all_text(data) -> str:
 
     # Join all extracted text with spaces
     return " ".join(filter(None, result))
+
+
+# Deeper structures are treated as opaque; real exports nest a handful of levels
+DEFAULT_MAX_DEPTH = 32
+
+
+def could_contain_math(text: str) -> bool:
+    """Cheap check for any math opener before running the tokenizer."""
+    return "$" in text or "\\(" in text or "\\[" in text
+
+
+def iter_text_leaves(data, max_depth: int = DEFAULT_MAX_DEPTH):
+    """
+    Iteratively walk any data structure and yield its string leaves that could contain math.
+
+    Dict keys are visited before their values and containers keep their order.
+    Non-string leaves (numbers, None, ...) are skipped instead of stringified,
+    and containers nested deeper than `max_depth` are not entered.
+
+    Args:
+        data: Any Python object (str, list, dict, etc.)
+        max_depth: Maximum container nesting to descend into
+
+    Yields:
+        str: String leaves containing a math delimiter
+    """
+    stack = [(data, 0)]
+    while stack:
+        item, depth = stack.pop()
+        if isinstance(item, str):
+            if could_contain_math(item):
+                yield item
+        elif depth >= max_depth:
+            continue
+        elif isinstance(item, dict):
+            children = []
+            for key, value in item.items():
+                children.append(key)
+                children.append(value)
+            stack.extend((child, depth + 1) for child in reversed(children))
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend((child, depth + 1) for child in reversed(list(item)))
+
+
+def extract_data_math_expressions(
+    data, delimiters: frozenset | None = None, max_depth: int = DEFAULT_MAX_DEPTH
+) -> list[str]:
+    """
+    Math expressions from every string leaf of `data`, without joining the leaves.
+
+    Block and inline math are both returned, in the order they appear, unless
+    `delimiters` (e.g. BLOCK_DELIMITERS) limits the kinds.
+    """
+    expressions = []
+    for text in iter_text_leaves(data, max_depth):
+        expressions.extend(
+            expression
+            for expression, delimiter, _ in iter_math_expressions(text)
+            if delimiters is None or delimiter in delimiters
+        )
+    return expressions
@@ -0,0 +1,156 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from categories import has_path, resolve_path
+
+
+# IDs pasted by operators: alphanumeric strings of 10+ characters
+ID_PATTERN = re.compile(r"[a-zA-Z0-9-]{10,}")
+ID_PATTERN_NO_DASH = re.compile(r"[a-zA-Z0-9]{10,}")
+
+
+def parse_ids(text: str, allow_dash: bool = True) -> list[str]:
+    """Extract pasted IDs from free text."""
+    pattern = ID_PATTERN if allow_dash else ID_PATTERN_NO_DASH
+    return pattern.findall(text)
+
+
+class WorkingSet:
+    """
+    The rows of an immutable base frame that are currently selected.
+
+    The selection is a boolean mask over `base`, and `id_key` values are mapped
+    to their row positions once, on the first lookup, so removing, adding or
+    extracting k IDs only touches the positions of those IDs. Every operation records the
+    positions it flipped; undo and redo flip them back.
+    """
+
+    def __init__(self, base: pd.DataFrame, id_key: str):
+        self.base = base
+        self.id_key = id_key
+        self.mask = np.ones(len(base), dtype=bool)
+        self.version = 0
+        self._undo = []
+        self._redo = []
+        self._frame = None
+        self._frame_version = -1
+        self._columns = {}
+        self._index = None
+
+    @property
+    def _positions(self) -> dict:
+        # Built lazily: opening a large dataset should not wait for the ID index
+        if self._index is None:
+            self._index = self._build_index(self.id_key)
+        return self._index
+
+    def _build_index(self, id_key: str) -> dict:
+        positions = {}
+        if has_path(self.base, id_key):
+            # In a columnar snapshot the IDs may only exist in the records
+            for position, row_id in enumerate(resolve_path(self.base, id_key).tolist()):
+                positions.setdefault(row_id, []).append(position)
+        return positions
+
+    def rekey(self, id_key: str):
+        """Switch the ID column, keeping the current selection and history."""
+        self.id_key = id_key
+        self._index = None
+
+    def rebase(self, base: pd.DataFrame):
+        """
+        Swap the base frame for one with the same rows (e.g. more columns).
+
+        The selection and history refer to row positions, so they are kept.
+        """
+        if len(base) != len(self.base):
+            raise ValueError("The new base frame must have the same rows")
+        self.base = base
+        self._frame_version = -1
+        self._columns = {}
+        self._index = None
+
+    def __len__(self):
+        return int(self.mask.sum())
+
+    def positions_of(self, ids) -> np.ndarray:
+        found = [p for row_id in set(ids) for p in self._positions.get(row_id, ())]
+        return np.asarray(found, dtype=np.intp)
+
+    def _flip(self, positions: np.ndarray):
+        self.mask[positions] ^= True
+        self.version += 1
+
+    def _commit(self, positions: np.ndarray) -> int:
+        if len(positions):
+            self._flip(positions)
+            self._undo.append(positions)
+            self._redo.clear()
+        return len(positions)
+
+    def remove(self, ids) -> int:
+        """Deselect rows whose ID is in `ids`. Returns the number of rows removed."""
+        positions = self.positions_of(ids)
+        return self._commit(positions[self.mask[positions]])
+
+    def add(self, ids) -> int:
+        """Reselect base rows whose ID is in `ids`. Returns the number of rows added."""
+        positions = self.positions_of(ids)
+        return self._commit(positions[~self.mask[positions]])
+
+    def extract(self, ids) -> int:
+        """Keep only selected rows whose ID is in `ids`. Returns the rows kept."""
+        keep = np.zeros(len(self.base), dtype=bool)
+        keep[self.positions_of(ids)] = True
+        self._commit(np.flatnonzero(self.mask & ~keep))
+        return len(self)
+
+    def restore(self) -> int:
+        """Select every base row again. Returns the number of rows restored."""
+        return self._commit(np.flatnonzero(~self.mask))
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self):
+        if self._undo:
+            positions = self._undo.pop()
+            self._flip(positions)
+            self._redo.append(positions)
+
+    def redo(self):
+        if self._redo:
+            positions = self._redo.pop()
+            self._flip(positions)
+            self._undo.append(positions)
+
+    def frame(self) -> pd.DataFrame:
+        """The selected rows, materialized once per version."""
+        if self._frame_version != self.version:
+            if self.mask.all():
+                self._frame = self.base
+            else:
+                self._frame = self.base[self.mask].reset_index(drop=True)
+            self._frame_version = self.version
+        return self._frame
+
+    def column(self, path: str) -> pd.Series:
+        """
+        Values of a (possibly nested) key for the selected rows.
+
+        The key is resolved over the whole base frame once and cached, so
+        later operations only need to apply the mask.
+        """
+        if path not in self._columns:
+            self._columns[path] = resolve_path(self.base, path)
+        values = self._columns[path]
+        if self.mask.all():
+            return values
+        return values[self.mask].reset_index(drop=True)
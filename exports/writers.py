@@ -0,0 +1,154 @@
+import csv
+import json
+import os
+import tempfile
+
+
+WRITE_CHUNK_ROWS = 5_000
+
+
+class SchemaTracker:
+    """Columns of a stream of row dicts, in the order they were first seen."""
+
+    def __init__(self, columns=()):
+        self._columns = dict.fromkeys(columns)
+
+    def observe(self, row):
+        if isinstance(row, dict):
+            for key in row:
+                if key not in self._columns:
+                    self._columns[key] = None
+
+    def merge(self, columns):
+        for key in columns:
+            if key not in self._columns:
+                self._columns[key] = None
+
+    @property
+    def columns(self) -> list:
+        return list(self._columns)
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def _temp_path(suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        return tmp.name
+
+
+def write_csv(
+    rows: list, columns: list, path: str | None = None, chunk_rows: int = WRITE_CHUNK_ROWS
+) -> str:
+    """
+    Stream row dicts to a CSV file with a fixed column order.
+
+    Returns:
+        str: Path of the written file (a temporary file when `path` is omitted)
+    """
+    path = path or _temp_path(".csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for chunk in _chunks(rows, chunk_rows):
+            writer.writerows(row for row in chunk if isinstance(row, dict))
+    return path
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _parquet_schema(rows: list, columns: list, chunk_rows: int):
+    """
+    Column types that fit every chunk of `rows`.
+
+    Types are widened across chunks (nulls take the other type, int64 becomes
+    double, structs gain fields); columns whose values cannot share a type,
+    or that are empty throughout, are written as strings.
+    """
+    import pyarrow as pa
+
+    types = dict.fromkeys(columns, pa.null())
+    text = set()
+    for chunk in _chunks(rows, chunk_rows):
+        chunk = [row for row in chunk if isinstance(row, dict)]
+        for column in columns:
+            if column in text:
+                continue
+            try:
+                arrow_type = pa.array([row.get(column) for row in chunk]).type
+                types[column] = (
+                    pa.unify_schemas(
+                        [
+                            pa.schema([("value", types[column])]),
+                            pa.schema([("value", arrow_type)]),
+                        ],
+                        promote_options="permissive",
+                    )
+                    .field("value")
+                    .type
+                )
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                text.add(column)
+    return pa.schema(
+        [
+            pa.field(
+                str(column),
+                (
+                    pa.string()
+                    if column in text or pa.types.is_null(arrow_type)
+                    else arrow_type
+                ),
+            )
+            for column, arrow_type in types.items()
+        ]
+    )
+
+
+def write_parquet(
+    rows: list, columns: list, path: str | None = None, chunk_rows: int = WRITE_CHUNK_ROWS
+) -> str:
+    """
+    Stream row dicts to a Parquet file, one row group per chunk.
+
+    Column types are inferred over all rows first (see _parquet_schema), so
+    a column that is empty or integral in the first chunk can still hold
+    other values later. The file is removed again when writing fails.
+
+    Returns:
+        str: Path of the written file (a temporary file when `path` is omitted)
+
+    Raises:
+        ImportError: If pyarrow is not installed
+        ValueError: If values do not fit their column type
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = path or _temp_path(".parquet")
+    schema = _parquet_schema(rows, columns, chunk_rows)
+    try:
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in _chunks(rows, chunk_rows):
+                chunk = [row for row in chunk if isinstance(row, dict)]
+                arrays = []
+                for column, field in zip(columns, schema):
+                    values = [row.get(column) for row in chunk]
+                    if pa.types.is_string(field.type):
+                        values = [_text(value) for value in values]
+                    arrays.append(pa.array(values, type=field.type))
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    except BaseException as e:
+        if os.path.exists(path):
+            os.remove(path)
+        if isinstance(e, (pa.ArrowInvalid, pa.ArrowTypeError)):
+            raise ValueError(f"Rows do not fit the column types: {e}") from e
+        raise
+    return path
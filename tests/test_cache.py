@@ -0,0 +1,100 @@
+from cache import ValidationCache, normalize_expression
+from interfaces import ParseType
+
+
+VALID = (True, False, "")
+
+
+def test_memory_hit_ignores_whitespace():
+    cache = ValidationCache(path=None)
+    cache.put("x^2 +  1", ParseType.SYMPY_ANTLR, VALID)
+
+    assert cache.get("x^2 + 1", ParseType.SYMPY_ANTLR) == VALID
+    assert cache.get("x^2 + 1", ParseType.PYLATEXENC) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert normalize_expression(" a\n b ") == "a b"
+
+
+def test_memory_tier_is_lru():
+    cache = ValidationCache(path=None, memory_entries=2)
+    for text in ("a", "b"):
+        cache.put(text, ParseType.PYLATEXENC, VALID)
+    cache.get("a", ParseType.PYLATEXENC)
+    cache.put("c", ParseType.PYLATEXENC, VALID)
+
+    assert cache.get("a", ParseType.PYLATEXENC) == VALID
+    assert cache.get("b", ParseType.PYLATEXENC) is None
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / "validation.sqlite")
+    ValidationCache(path).put_many(
+        [("\\frac{1}{2}", VALID), ("\\frac{1", (False, False, "missing }"))],
+        ParseType.SYMPY_LARK,
+    )
+
+    cache = ValidationCache(path)
+
+    assert cache.get("\\frac{1", ParseType.SYMPY_LARK) == (False, False, "missing }")
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_other_parser_versions_are_not_reused(tmp_path):
+    path = str(tmp_path / "validation.sqlite")
+    ValidationCache(path, version="old").put("x", ParseType.SYMPY_ANTLR, VALID)
+
+    assert ValidationCache(path, version="new").get("x", ParseType.SYMPY_ANTLR) is None
+    assert ValidationCache(path, version="old").get("x", ParseType.SYMPY_ANTLR) == VALID
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ValidationCache(str(tmp_path / "validation.sqlite"), disk_bytes=2_000)
+    for i in range(100):
+        cache.put(f"expression {i}", ParseType.PYLATEXENC, VALID)
+
+    assert cache.stats()["disk_bytes"] <= 2_000
+    reopened = ValidationCache(str(tmp_path / "validation.sqlite"))
+    assert reopened.get("expression 99", ParseType.PYLATEXENC) == VALID
+    assert reopened.get("expression 0", ParseType.PYLATEXENC) is None
+
+
+def test_clear_empties_both_tiers(tmp_path):
+    path = str(tmp_path / "validation.sqlite")
+    cache = ValidationCache(path)
+    cache.put("x", ParseType.PYLATEXENC, VALID)
+    cache.clear()
+
+    assert cache.get("x", ParseType.PYLATEXENC) is None
+    assert ValidationCache(path).get("x", ParseType.PYLATEXENC) is None
+
+
+def test_disk_hits_do_not_hold_the_write_lock(tmp_path):
+    path = str(tmp_path / "validation.sqlite")
+    ValidationCache(path).put("x", ParseType.PYLATEXENC, VALID)
+    first = ValidationCache(path)
+    assert first.get("x", ParseType.PYLATEXENC) == VALID
+
+    # Another process (the CLI, a second server) touching the same row
+    second = ValidationCache(path)
+    second._conn.execute("PRAGMA busy_timeout = 100")
+    assert second.get("x", ParseType.PYLATEXENC) == VALID
+    second.put("y", ParseType.PYLATEXENC, VALID)
+    assert ValidationCache(path).get("y", ParseType.PYLATEXENC) == VALID
+
+
+def test_failed_write_is_rolled_back(tmp_path):
+    path = str(tmp_path / "validation.sqlite")
+    cache = ValidationCache(path)
+    cache.put("x", ParseType.PYLATEXENC, VALID)
+    size = cache.stats()["disk_bytes"]
+
+    blocker = ValidationCache(path)
+    blocker._conn.execute("BEGIN IMMEDIATE")
+    cache._conn.execute("PRAGMA busy_timeout = 100")
+    cache.put("y", ParseType.PYLATEXENC, VALID)
+    blocker._conn.rollback()
+
+    assert cache.stats()["disk_bytes"] == size
+    assert not cache._conn.in_transaction
+    assert cache.get("y", ParseType.PYLATEXENC) == VALID
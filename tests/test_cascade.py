@@ -0,0 +1,80 @@
+import pytest
+
+from interfaces import CascadeTier, ParseType
+from utils import (
+    check_structure,
+    validate_text_antlr,
+    validate_text_cascade,
+    validate_text_uncached,
+)
+
+EXPRESSIONS = [
+    "12",
+    "-3.5",
+    "\\frac{1}{2",
+    "x}",
+    "\\left( x",
+    "\\frac{1}{2}",
+    "\\frac{1}{}",
+    "\\mathbb{R}",
+    "x^2+1",
+    "$x$",
+]
+
+
+@pytest.mark.parametrize(
+    "text, decision",
+    [
+        ("12", True),
+        ("\\frac{1}{2", False),
+        ("x}", False),
+        ("\\left( x", False),
+        ("\\{x\\}", None),
+        ("\\frac{1}{2}", None),
+    ],
+)
+def test_structure_tier(text, decision):
+    assert check_structure(text)[0] is decision
+
+
+def test_only_unsafe_commands_need_pylatexenc():
+    assert not check_structure("\\frac{\\alpha}{2}")[3]
+    assert check_structure("\\mathbb{R}")[3]
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_full_cascade_agrees_with_sympy(text):
+    assert validate_text_cascade(text)[:2] == validate_text_antlr(text)[:2]
+
+
+def test_cheap_tiers_decide_first():
+    assert validate_text_cascade("12")[3] == CascadeTier.STRUCTURE
+    assert validate_text_cascade("x}")[3] == CascadeTier.STRUCTURE
+    assert validate_text_cascade("x^2+1")[3] == CascadeTier.SYMPY
+
+
+def test_stop_after_accepts_what_the_cheaper_tiers_pass():
+    # Only sympy rejects the empty group
+    assert validate_text_cascade("\\frac{1}{}")[0] is False
+    assert validate_text_cascade("\\frac{1}{}", CascadeTier.STRUCTURE)[:2] == (
+        True,
+        False,
+    )
+    assert validate_text_cascade("\\mathbb{R}", CascadeTier.PYLATEXENC)[3] == (
+        CascadeTier.PYLATEXENC
+    )
+    assert validate_text_uncached("\\frac{1}{}", ParseType.CASCADE_PYLATEXENC) == (
+        True,
+        False,
+        "",
+        CascadeTier.STRUCTURE,
+    )
+
+
+def test_empty_text_is_rejected():
+    assert validate_text_cascade("") == (
+        False,
+        False,
+        "No text to validate",
+        CascadeTier.STRUCTURE,
+    )
@@ -0,0 +1,54 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+from cli import main
+
+resource = pytest.importorskip("resource")
+
+
+def test_split_writes_every_category_in_chunks(tmp_path):
+    records = [{"idx": i, "meta": {"cat": f"c{i % 300}"}} for i in range(1_200)]
+    records.append({"idx": "no category"})
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps(record) + "\n" for record in records))
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    # A file left by an earlier run is replaced, not appended to
+    (output_dir / "c0_items.jsonl").write_text('{"idx": "stale"}\n')
+    archive = tmp_path / "split.zip"
+
+    # Far fewer descriptors than categories
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    in_use = len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else 64
+    resource.setrlimit(resource.RLIMIT_NOFILE, (in_use + 32, hard))
+    try:
+        exit_code = main(
+            [
+                "split",
+                str(source),
+                "--key",
+                "meta.cat",
+                "--chunk-rows",
+                "50",
+                "--output-dir",
+                str(output_dir),
+                "--zip",
+                str(archive),
+            ]
+        )
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    assert exit_code == 0
+    files = sorted(output_dir.iterdir())
+    assert len(files) == 300
+    c0 = [
+        json.loads(line)
+        for line in (output_dir / "c0_items.jsonl").read_text().splitlines()
+    ]
+    assert [record["idx"] for record in c0] == [0, 300, 600, 900]
+    with zipfile.ZipFile(archive) as zf:
+        assert len(zf.namelist()) == 300
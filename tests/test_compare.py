@@ -0,0 +1,74 @@
+import pytest
+
+import compare
+from compare import ComparisonJob, result_error
+from interfaces import CascadeTier, ParseType
+
+A, B, C = ParseType.PYLATEXENC, ParseType.SYMPY_LARK, ParseType.SYMPY_ANTLR
+
+
+@pytest.fixture
+def fake_parsers(monkeypatch):
+    # A accepts everything, B rejects "bad" expressions and C rejects "worse" ones
+    def fake_validate_batch(expressions, parse_type, use_cache, worker_seconds):
+        worker_seconds.append(0.5)
+        rejects = {A: (), B: ("bad",), C: ("worse",)}[parse_type]
+        return [
+            (not any(word in text for word in rejects), False, "no")
+            for text in expressions
+        ]
+
+    monkeypatch.setattr(compare, "validate_batch", fake_validate_batch)
+
+
+def run(job):
+    job.start()
+    job._thread.join()
+    assert job.status == "done", job.error
+    return job
+
+
+def test_rows_where_parsers_disagree(fake_parsers):
+    job = run(
+        ComparisonJob(
+            ["r1", "r2", "r3"],
+            ["$$x$$ and $$bad$$", "$$y$$", "$$bad worse$$"],
+            [A, B, C],
+            batch_rows=2,
+        )
+    )
+
+    assert [row["id"] for row in job.results] == ["r1", "r3"]
+    assert job.results[0]["expressions"] == [
+        {
+            "expression": "bad",
+            "errors": {"pylatexenc": "", "sympy-lark": "no", "sympy-antlr": ""},
+        }
+    ]
+    summary = job.summary()
+    assert summary["expressions"] == 4
+    assert summary["rejected"] == {A: 0, B: 2, C: 1}
+    assert summary["disagreements"][(A, B)] == 2
+    assert summary["disagreements"][(C, B)] == 1
+    assert summary["disagreements"][(B, C)] == 0
+    # One worker time per parser and batch
+    assert summary["seconds"] == {A: 1.0, B: 1.0, C: 1.0}
+
+    matrix = job.matrix()
+    assert matrix.loc["pylatexenc", "sympy-lark"] == 2
+    assert matrix.isna().to_numpy().diagonal().all()
+    assert job.latency()["Expressions/s"].tolist() == [4.0, 4.0, 4.0]
+
+
+def test_needs_two_distinct_parsers():
+    with pytest.raises(ValueError):
+        ComparisonJob(["r1"], ["$$x$$"], [A, A])
+
+
+def test_result_error_names_the_cascade_tier():
+    assert result_error((True, False, "")) == ""
+    assert result_error((False, False, "")) == "invalid"
+    assert (
+        result_error((False, False, "missing }", CascadeTier.STRUCTURE))
+        == "[structure] missing }"
+    )
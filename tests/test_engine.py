@@ -0,0 +1,22 @@
+import os
+
+import engine
+from engine import map_in_pool, shutdown_pool
+
+
+def _crash_once(marker: str, value: int) -> int:
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return value * 2
+
+
+def test_a_broken_pool_is_replaced(tmp_path):
+    marker = str(tmp_path / "crashed")
+    try:
+        assert map_in_pool(2, _crash_once, [marker] * 3, [1, 2, 3]) == [2, 4, 6]
+        pool = engine._pool
+        assert map_in_pool(2, _crash_once, [marker], [4]) == [8]
+        assert engine._pool is pool
+    finally:
+        shutdown_pool()
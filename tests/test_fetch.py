@@ -0,0 +1,126 @@
+import hashlib
+import http.client
+import json
+import os
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch import fetch_url
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """Serves `server.body` with an ETag, honouring If-None-Match and If-Range."""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body, etag = server.body, server.etag
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == etag:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        if server.cut_after is not None:
+            # Drop the connection part way, like an interrupted download
+            self.wfile.write(body[start : start + server.cut_after])
+            server.cut_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ExportHandler)
+    server.body = b"".join(
+        json.dumps({"id": i, "text": "x" * 50}).encode() + b"\n" for i in range(200)
+    )
+    server.etag = '"v1"'
+    server.cut_after = None
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/export.jsonl"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read(result) -> bytes:
+    with open(result.path, "rb") as f:
+        return f.read()
+
+
+def test_unchanged_export_is_revalidated_with_304(server, tmp_path):
+    first = fetch_url(server.url, cache_dir=str(tmp_path))
+    second = fetch_url(server.url, cache_dir=str(tmp_path))
+
+    assert not first.from_cache
+    assert second.from_cache
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert read(second) == server.body
+    assert second.cache_key == first.cache_key
+    assert second.sha256 == hashlib.sha256(server.body).hexdigest()
+
+
+def test_interrupted_download_resumes_with_range(server, tmp_path):
+    server.cut_after = 1000
+    with pytest.raises((urllib.error.URLError, http.client.IncompleteRead)):
+        fetch_url(server.url, cache_dir=str(tmp_path))
+    (part,) = [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+    assert os.path.getsize(tmp_path / part) == 1000
+
+    result = fetch_url(server.url, cache_dir=str(tmp_path))
+
+    assert server.requests[1]["Range"] == "bytes=1000-"
+    assert server.requests[1]["If-Range"] == '"v1"'
+    assert read(result) == server.body
+    assert result.size == len(server.body)
+    assert result.sha256 == hashlib.sha256(server.body).hexdigest()
+
+
+def test_resume_restarts_when_the_etag_changed(server, tmp_path):
+    server.cut_after = 1000
+    with pytest.raises((urllib.error.URLError, http.client.IncompleteRead)):
+        fetch_url(server.url, cache_dir=str(tmp_path))
+    server.body = server.body.replace(b"x", b"y")
+    server.etag = '"v2"'
+
+    result = fetch_url(server.url, cache_dir=str(tmp_path))
+
+    assert read(result) == server.body
+    assert result.sha256 == hashlib.sha256(server.body).hexdigest()
+
+
+def test_changed_etag_downloads_the_new_body(server, tmp_path):
+    first = fetch_url(server.url, cache_dir=str(tmp_path))
+    server.body = server.body + b'{"id": 200}\n'
+    server.etag = '"v2"'
+
+    second = fetch_url(server.url, cache_dir=str(tmp_path))
+
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert not second.from_cache
+    assert read(second) == server.body
+    assert second.cache_key != first.cache_key
+    assert fetch_url(server.url, cache_dir=str(tmp_path)).from_cache
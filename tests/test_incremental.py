@@ -0,0 +1,80 @@
+import incremental
+from incremental import ValidationState, content_hash
+from supervisor import TIMEOUT_ERROR
+
+TIMED_OUT = (False, False, f"{TIMEOUT_ERROR}: validation took longer than 10s")
+
+
+def test_supervision_errors_are_validated_again(monkeypatch):
+    outcomes = {"slow": [TIMED_OUT, (True, True, "")], "x^2": [(True, False, "")]}
+    calls = []
+
+    def fake_validate_batch(texts, parse_type):
+        calls.append(list(texts))
+        return [outcomes[text].pop(0) for text in texts]
+
+    monkeypatch.setattr(incremental, "validate_batch", fake_validate_batch)
+    state = ValidationState()
+
+    assert state.sync(["a", "b"], ["slow", "x^2"]) == [TIMED_OUT, (True, False, "")]
+    assert state.summary() == {"total": 2, "valid": 1, "numbers": 0}
+
+    # Only the timed-out row is validated again, and the counts follow its new result
+    assert state.sync(["a", "b"], ["slow", "x^2"]) == [
+        (True, True, ""),
+        (True, False, ""),
+    ]
+    assert calls == [["slow", "x^2"], ["slow"]]
+    assert state.summary() == {"total": 2, "valid": 2, "numbers": 1}
+
+    state.sync(["a", "b"], ["slow", "x^2"])
+    assert len(calls) == 2
+
+
+def counting_validate_batch(monkeypatch):
+    calls = []
+
+    def fake_validate_batch(texts, parse_type):
+        calls.append(list(texts))
+        return [(text.startswith("ok"), text.endswith("1"), "") for text in texts]
+
+    monkeypatch.setattr(incremental, "validate_batch", fake_validate_batch)
+    return calls
+
+
+def test_only_new_or_edited_rows_are_validated(monkeypatch):
+    calls = counting_validate_batch(monkeypatch)
+    state = ValidationState()
+
+    results = state.sync(["a", "b", "c"], ["ok1", "bad", "ok2"])
+    assert [result[0] for result in results] == [True, False, True]
+    assert state.last_validated == 3
+
+    # "b" is edited, "c" is removed and "d" is added
+    state.sync(["a", "b", "d"], ["ok1", "ok1", "ok2"])
+    assert calls[-1] == ["ok1", "ok2"]
+    assert state.last_validated == 2
+    assert state.summary() == {"total": 3, "valid": 3, "numbers": 2}
+
+    state.sync(["a", "b", "d"], ["ok1", "ok1", "ok2"])
+    assert state.last_validated == 0
+    assert len(calls) == 2
+
+
+def test_counts_follow_rows_leaving_and_returning(monkeypatch):
+    counting_validate_batch(monkeypatch)
+    state = ValidationState()
+
+    state.sync(["a", "b"], ["ok1", "bad"])
+    state.sync(["a"], ["ok1"])
+    assert state.summary() == {"total": 1, "valid": 1, "numbers": 1}
+
+    # A returning row reuses its stored result, and duplicate IDs count twice
+    state.sync(["a", "b", "b"], ["ok1", "bad", "bad"])
+    assert state.last_validated == 0
+    assert state.summary() == {"total": 3, "valid": 1, "numbers": 1}
+
+
+def test_content_hash_distinguishes_types():
+    assert content_hash("1") != content_hash(1)
+    assert content_hash({"a": 1, "b": 2}) == content_hash({"b": 2, "a": 1})
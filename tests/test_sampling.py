@@ -0,0 +1,53 @@
+import math
+
+import numpy as np
+import pytest
+
+from sampling import OVERALL, estimate_rates, sample_order, wilson_interval
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_stratified_prefixes_keep_every_stratum_in_proportion(seed):
+    categories = ["a"] * 50 + [None] * 30 + [float("nan")] * 10 + ["b"] * 10
+    strata = {
+        "a": set(range(50)),
+        "missing": set(range(50, 90)),
+        "b": set(range(90, 100)),
+    }
+
+    order = sample_order(len(categories), categories, seed)
+
+    assert sorted(order) == list(range(100))
+    for size in (5, 10, 37, 100):
+        prefix = set(order[:size].tolist())
+        for rows in strata.values():
+            share = len(prefix & rows)
+            assert abs(share - size * len(rows) / 100) <= 1
+
+
+def test_random_order_is_a_seeded_permutation():
+    assert sorted(sample_order(20)) == list(range(20))
+    assert np.array_equal(sample_order(20, seed=3), sample_order(20, seed=3))
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(0, 10)
+    assert low == pytest.approx(0.0, abs=1e-9) and 0 < high < 0.35
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high
+    assert math.isclose(0.5 - low, high - 0.5)
+
+
+def test_estimate_rates_per_category():
+    estimates = estimate_rates(
+        {"Valid": [True, True, False, True]},
+        ["a", "a", "b", "b"],
+        population={"a": 20, "b": 80},
+    ).set_index("Category")
+
+    assert estimates.loc[OVERALL, "Sampled"] == 4
+    assert estimates.loc[OVERALL, "Rows"] == 100
+    assert estimates.loc["a", "Valid %"] == 100
+    assert estimates.loc["b", "Valid %"] == 50
+    assert estimates.loc["b", "Valid low %"] < 50 < estimates.loc["b", "Valid high %"]
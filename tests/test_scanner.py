@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from bench import extract_math_expressions_regex
+from utils import extract_math_expressions, iter_math_expressions
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (r"cost \$5 and $x$", ["x"]),
+        (r"$a \$ b$", [r"a \$ b"]),
+        (r"$$x \$$ y$$", [r"x \$$ y"]),
+        ("$x", []),
+        ("$$x$", ["x"]),
+        (r"\[x", []),
+        (r"\(x", []),
+        (r"$a$ \[b\] $$c$$ \(d\)", ["a", "b", "c", "d"]),
+        (r"$\(x\)$ \[$y$\]", [r"\(x\)", "$y$"]),
+        ("$$$x$$", ["$x"]),
+    ],
+)
+def test_scanner_edge_cases(text, expected):
+    assert [content for content, _, _ in iter_math_expressions(text)] == expected
+
+
+def test_scanner_reports_delimiters_and_offsets():
+    text = r"a $x$ b \[y\]"
+    assert list(iter_math_expressions(text)) == [("x", "$", 2), ("y", r"\[", 8)]
+
+
+def test_scanner_matches_regex_reference():
+    rng = random.Random(0)
+    pieces = ["$", "$$", "\\", "\\$", "\\[", "\\]", "\\(", "\\)", "x", " ", "{", "}"]
+    for _ in range(20_000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 20)))
+        assert extract_math_expressions(text) == extract_math_expressions_regex(
+            text
+        ), text
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from categories import RECORD_COLUMN, has_path, resolve_path
+from snapshot import extend_snapshot, iter_records, load_snapshot
+from workingset import WorkingSet
+
+pytest.importorskip("pyarrow")
+
+
+RECORDS = [
+    {"idx": 1, "v": "a", "meta": {"group": "x"}, "context": [{"n": 1}]},
+    {"idx": "abcdefghijk", "v": "b", "meta": {"group": "y"}, "context": []},
+    {"idx": 3, "v": "a", "meta": {"group": "x"}, "context": [{"n": 2}]},
+]
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATASET_SNAPSHOT_DIR", str(tmp_path))
+
+
+def source():
+    return pd.DataFrame(RECORDS, dtype=object)
+
+
+def test_snapshot_keeps_the_records_and_flattens_flat_paths():
+    df = load_snapshot("dataset", ["v", "meta.group", "context"], source)
+
+    assert list(iter_records(df)) == RECORDS
+    assert "meta.group" in df.columns
+    # Mixed-type and nested paths are read from the records instead
+    assert "idx" not in df.columns and "context" not in df.columns
+    assert resolve_path(df, "context").tolist() == [r["context"] for r in RECORDS]
+    assert df["v"].astype(str).tolist() == ["a", "b", "a"]
+
+
+def test_reload_does_not_rebuild_the_records():
+    load_snapshot("dataset", ["v"], source)
+
+    def fail():
+        raise AssertionError("records were rebuilt")
+
+    df = load_snapshot("dataset", ["v", "meta.group"], fail)
+    assert resolve_path(df, "meta.group").astype(str).tolist() == ["x", "y", "x"]
+
+
+def test_extend_snapshot_adds_columns_for_the_same_rows():
+    df = load_snapshot("dataset", ["v"], source)
+
+    extended = extend_snapshot(df, "dataset", ["v", "meta.group"])
+
+    assert list(extended.columns) == ["v", "meta.group", RECORD_COLUMN]
+    assert extend_snapshot(extended, "dataset", ["v", "meta.group"]) is None
+    assert extend_snapshot(extended, "dataset", ["idx"]) is None
+
+
+def test_ids_that_only_exist_in_the_records_are_found():
+    df = load_snapshot("dataset", ["idx", "v"], source)
+    assert has_path(df, "idx") and "idx" not in df.columns
+
+    working_set = WorkingSet(df, "idx")
+    assert working_set.remove(["abcdefghijk"]) == 1
+    assert working_set.column("idx").tolist() == [1, 3]
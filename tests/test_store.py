@@ -0,0 +1,88 @@
+import gc
+import threading
+import time
+
+import pandas as pd
+
+from store import DatasetStore, deep_sizeof, frame_nbytes
+
+
+def frame(rows: int = 1_000) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"idx": range(rows), "meta": [{"text": "x" * 100} for _ in range(rows)]},
+        dtype=object,
+    )
+
+
+def test_nested_cells_are_measured():
+    value = {"a": ["x" * 1_000]}
+    assert deep_sizeof(value) > 1_000
+    shallow = int(frame().memory_usage(index=True, deep=True).sum())
+    assert frame_nbytes(frame()) > shallow
+
+
+def test_loads_are_shared_and_concurrent_loads_read_once():
+    store = DatasetStore(budget_mb=0)
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.1)
+        return frame()
+
+    leases = []
+    threads = [
+        threading.Thread(target=lambda: leases.append(store.load("k", load)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({id(lease.df) for lease, _, _ in leases}) == 1
+    assert sorted(resident for _, _, resident in leases) == [False, True, True, True]
+    assert store.stats()[0]["sessions"] == 4
+
+
+def test_unleased_datasets_are_evicted_least_recently_used_first():
+    size = frame_nbytes(frame())
+    store = DatasetStore(budget_mb=1)
+    store.budget_bytes = int(size * 2.5)
+
+    first = store.put(frame(), key="first")
+    store.put(frame(), key="second")
+    third = store.put(frame(), key="third")
+    # "second" has no lease left, so it goes while the leased ones stay
+    assert [entry["key"] for entry in store.stats()] == ["first", "third"]
+
+    del first
+    gc.collect()
+    store.put(frame(), key="fourth")
+    assert [entry["key"] for entry in store.stats()] == ["third", "fourth"]
+    assert third.df is not None
+
+
+def test_datasets_in_use_are_kept_over_budget():
+    store = DatasetStore(budget_mb=1)
+    store.budget_bytes = 1
+    leases = [store.put(frame(), key=key) for key in "abc"]
+
+    assert len(store.stats()) == 3
+    del leases
+    gc.collect()
+    assert store.evict_unused() == 3
+    assert store.stats() == []
+
+
+def test_replace_keeps_the_previous_frame_for_its_sessions():
+    store = DatasetStore(budget_mb=0)
+    old = store.put(frame(), "file.jsonl", key="k")
+    extended = frame().assign(extra=1)
+
+    new = store.replace("k", extended)
+
+    assert "extra" not in old.df.columns
+    assert new.df is extended
+    assert store.stats()[0]["source"] == "file.jsonl"
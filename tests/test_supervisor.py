@@ -0,0 +1,94 @@
+import pytest
+
+import supervisor
+from engine import MIN_PARALLEL_BATCH, MP_CONTEXT, validate_batch
+from interfaces import ParseType
+from supervisor import (
+    RESOURCE_ERROR,
+    STARTUP_TIMEOUT,
+    TIMEOUT_ERROR,
+    SupervisedPool,
+    error_class,
+    is_supervision_error,
+)
+
+
+@pytest.fixture
+def pool():
+    pool = SupervisedPool(workers=2, timeout=30, memory_mb=0, mp_context=MP_CONTEXT)
+    yield pool
+    pool.close()
+
+
+def test_error_class():
+    assert error_class("") == ""
+    assert error_class(f"{TIMEOUT_ERROR}: took too long") == TIMEOUT_ERROR
+    assert error_class(f"{RESOURCE_ERROR}: killed") == RESOURCE_ERROR
+    assert error_class("Unexpected end-of-input") == "parse"
+    assert is_supervision_error((False, False, f"{TIMEOUT_ERROR}: x"))
+    assert not is_supervision_error((False, False, "missing }"))
+
+
+def test_workers_start_on_demand_with_the_parsers_they_need(pool):
+    seconds = []
+    (results,) = pool.map_chunks(
+        [["x^2", "\\frac{1}{2}"]], ParseType.PYLATEXENC, seconds
+    )
+
+    assert [result[0] for result in results] == [True, True]
+    assert len(seconds) == 2
+    assert len(pool._workers) == 1
+    assert pool._workers[0].loaded == {ParseType.PYLATEXENC}
+
+
+def test_chunks_are_spread_over_workers_in_order(pool):
+    chunks = [[f"x^{i}"] * 3 for i in range(4)]
+
+    results = pool.map_chunks(chunks, ParseType.PYLATEXENC)
+
+    assert [len(chunk) for chunk in results] == [3, 3, 3, 3]
+    assert len(pool._workers) <= pool.workers
+
+
+class _StallFirstResult:
+    """Pipe end whose first wait for a result times out, as if the parse hung."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.stalled = False
+
+    def poll(self, timeout):
+        if timeout != STARTUP_TIMEOUT and not self.stalled:
+            self.stalled = True
+            return False
+        return self.conn.poll(timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+def test_timeout_restarts_the_worker_and_resends_the_rest(pool):
+    worker = pool._acquire()
+    pool._idle.put(worker)
+    worker.conn = _StallFirstResult(worker.conn)
+    process = worker.process
+
+    (results,) = pool.map_chunks([["x^2", "y^2"]], ParseType.PYLATEXENC)
+
+    assert error_class(results[0][2]) == TIMEOUT_ERROR
+    assert results[1][0]
+    assert worker.process is not process
+    assert not process.is_alive()
+
+
+def test_small_batches_use_one_worker():
+    try:
+        texts = [f"x^{{{i}}}" for i in range(MIN_PARALLEL_BATCH - 1)]
+        results = validate_batch(
+            texts, ParseType.PYLATEXENC, workers=4, use_cache=False, timeout=30
+        )
+        assert len(results) == len(texts)
+        assert all(result[0] for result in results)
+        assert len(supervisor._pool._workers) == 1
+    finally:
+        supervisor.shutdown_supervised_pool()
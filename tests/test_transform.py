@@ -0,0 +1,43 @@
+import pytest
+
+from engine import shutdown_pool
+from transform import transform_records
+
+
+def records(n):
+    return [{"id": i, "value": i * 2} for i in range(n)]
+
+
+def test_rows_are_transformed_in_order_with_their_columns():
+    results, errors, columns = transform_records(
+        records(5), '{"id": id, "double": value * 2}', chunk_rows=2
+    )
+
+    assert results == [{"id": i, "double": i * 4} for i in range(5)]
+    assert errors == []
+    assert columns == ["id", "double"]
+
+
+def test_failing_rows_yield_none_and_an_error():
+    rows = [{"value": 1}, {"value": "x"}, {"value": 3}]
+
+    results, errors, _ = transform_records(rows, "value + 1", chunk_rows=2)
+
+    assert results == [2, None, 4]
+    assert [position for position, _ in errors] == [1]
+
+
+def test_invalid_expression_raises_once():
+    with pytest.raises(Exception):
+        transform_records(records(3), "{")
+
+
+def test_parallel_chunks_match_the_serial_result():
+    rows = records(6_000)
+    expression = '{"id": id, "odd": value % 4 = 2}'
+    try:
+        parallel = transform_records(rows, expression, workers=2, chunk_rows=1_000)
+    finally:
+        shutdown_pool()
+
+    assert parallel == transform_records(rows, expression, workers=1)
@@ -0,0 +1,48 @@
+import time
+
+import supervisor
+from engine import MP_CONTEXT, warm_up_workers
+from interfaces import ParseType
+from supervisor import SupervisedPool
+
+
+def test_warm_up_loads_parse_types_in_one_worker():
+    pool = SupervisedPool(workers=2, timeout=30, memory_mb=0, mp_context=MP_CONTEXT)
+    try:
+        pool.warm_up([ParseType.PYLATEXENC]).join()
+
+        assert isinstance(pool.load_seconds[ParseType.PYLATEXENC], float)
+        assert len(pool._workers) == 1
+        assert pool._workers[0].loaded == {ParseType.PYLATEXENC}
+        assert pool.warm_up([ParseType.PYLATEXENC]) is None
+
+        # The warmed worker takes the next chunk without loading again
+        (results,) = pool.map_chunks([["x^2"]], ParseType.PYLATEXENC)
+        assert results[0][0]
+        assert len(pool._workers) == 1
+    finally:
+        pool.close()
+
+
+def test_warm_up_workers_uses_the_shared_pool():
+    try:
+        status = warm_up_workers([ParseType.PYLATEXENC], workers=2, timeout=30)
+
+        assert status == {ParseType.PYLATEXENC: "loading"}
+        deadline = time.monotonic() + 60
+        while supervisor._pool.load_seconds[ParseType.PYLATEXENC] == "loading":
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert len(supervisor._pool._workers) == 1
+        assert (
+            warm_up_workers([ParseType.PYLATEXENC], workers=2, timeout=30)[
+                ParseType.PYLATEXENC
+            ]
+            == supervisor._pool.load_seconds[ParseType.PYLATEXENC]
+        )
+    finally:
+        supervisor.shutdown_supervised_pool()
+
+
+def test_warm_up_workers_without_supervision_loads_in_process():
+    assert warm_up_workers([ParseType.PYLATEXENC], timeout=0) == {}
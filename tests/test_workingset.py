@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from workingset import WorkingSet, parse_ids
+
+
+@pytest.fixture
+def working_set():
+    base = pd.DataFrame(
+        {
+            "idx": [f"id{i:08d}" for i in range(10)],
+            "meta": [{"group": i % 2} for i in range(10)],
+        },
+        dtype=object,
+    )
+    return WorkingSet(base, "idx")
+
+
+def ids(working_set):
+    return working_set.frame()["idx"].tolist()
+
+
+def test_parse_ids():
+    text = "id00000001, id00000002\nshort id-0000-0003"
+    assert parse_ids(text) == ["id00000001", "id00000002", "id-0000-0003"]
+    assert parse_ids(text, allow_dash=False) == ["id00000001", "id00000002"]
+
+
+def test_remove_add_and_extract(working_set):
+    assert working_set.remove(["id00000001", "id00000002", "missing000"]) == 2
+    assert len(working_set) == 8
+    assert working_set.add(["id00000001", "id00000003"]) == 1
+    assert "id00000001" in ids(working_set)
+
+    assert working_set.extract(["id00000001", "id00000002", "id00000005"]) == 2
+    assert ids(working_set) == ["id00000001", "id00000005"]
+    assert working_set.restore() == 8
+    assert len(working_set) == 10
+
+
+def test_undo_and_redo(working_set):
+    working_set.remove(["id00000000"])
+    working_set.extract(["id00000001", "id00000002"])
+
+    working_set.undo()
+    assert len(working_set) == 9
+    working_set.undo()
+    assert len(working_set) == 10
+    assert not working_set.can_undo
+
+    working_set.redo()
+    assert len(working_set) == 9
+    working_set.remove(["id00000009"])
+    assert not working_set.can_redo
+
+
+def test_column_follows_the_selection(working_set):
+    working_set.remove([f"id{i:08d}" for i in range(0, 10, 2)])
+    assert working_set.column("meta.group").tolist() == [1] * 5
+
+
+def test_rekey_and_rebase_keep_the_selection(working_set):
+    working_set.remove(["id00000000"])
+    base = working_set.base.assign(other=[f"other{i:05d}" for i in range(10)])
+
+    working_set.rebase(base)
+    working_set.rekey("other")
+    assert "other" in working_set.frame().columns
+    assert len(working_set) == 9
+    assert working_set.remove(["other00001"]) == 1
+    assert working_set.can_undo
+
+    with pytest.raises(ValueError):
+        working_set.rebase(base.iloc[:5])
@@ -0,0 +1,60 @@
+import csv
+
+import pytest
+
+import writers
+from writers import SchemaTracker, write_csv, write_parquet
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_schema_tracker_keeps_first_seen_order():
+    schema = SchemaTracker(["a"])
+    schema.observe({"b": 1, "a": 2})
+    schema.observe("not a row")
+    schema.merge(["c", "b"])
+    assert schema.columns == ["a", "b", "c"]
+
+
+def test_csv_has_the_fixed_columns(tmp_path):
+    rows = [{"a": 1}, None, {"b": "x", "a": 2}]
+    path = write_csv(rows, ["a", "b"], str(tmp_path / "out.csv"), chunk_rows=1)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        assert list(csv.DictReader(f)) == [{"a": "1", "b": ""}, {"a": "2", "b": "x"}]
+
+
+def test_parquet_types_are_widened_across_chunks(tmp_path):
+    rows = [
+        {"late": None, "number": 1, "mixed": 1, "nested": {"x": 1}},
+        {"late": "text", "number": 2.5, "mixed": "one", "nested": {"y": "z"}},
+    ]
+    path = write_parquet(
+        rows,
+        ["late", "number", "mixed", "nested", "empty"],
+        str(tmp_path / "out.parquet"),
+        chunk_rows=1,
+    )
+
+    table = pq.read_table(path)
+    assert str(table.schema.field("late").type) == "string"
+    assert str(table.schema.field("number").type) == "double"
+    assert str(table.schema.field("empty").type) == "string"
+    assert table.column("mixed").to_pylist() == ["1", "one"]
+    assert table.column("nested").to_pylist() == [
+        {"x": 1, "y": None},
+        {"x": None, "y": "z"},
+    ]
+    assert pq.ParquetFile(path).num_row_groups == 2
+
+
+def test_failed_parquet_write_removes_the_file(tmp_path, monkeypatch):
+    path = tmp_path / "out.parquet"
+    # A schema that the rows cannot fit
+    monkeypatch.setattr(
+        writers, "_parquet_schema", lambda *args: pa.schema([("a", pa.int64())])
+    )
+    with pytest.raises(ValueError):
+        write_parquet([{"a": "not a number"}], ["a"], str(path))
+    assert not path.exists()